@@ -1,56 +1,157 @@
 # backend/app/api/v1/block.py
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime, timedelta
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
 
-from app.core.database import get_db
+from app.core import cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db
 from app.services.analysis_service import CapitalFlowAnalysis
+from app.utils.date_utils import today_str
 
 router = APIRouter(prefix="/api/v1/block", tags=["block"])
 
+# 流式查询每批从数据库读取的行数
+STREAM_BATCH_SIZE = 200
+
+# 预编译的SQL语句（模块加载时构建一次，各请求复用）
+_BLOCK_LIST_QUERY = """
+SELECT DISTINCT 
+    block_code,
+    block_name,
+    block_type,
+    COUNT(DISTINCT stock_code) as stock_count
+FROM stock_block_membership
+{condition}
+GROUP BY block_code, block_name, block_type ORDER BY stock_count DESC
+"""
+BLOCK_LIST_SQL = text(_BLOCK_LIST_QUERY.format(condition=""))
+BLOCK_LIST_BY_TYPE_SQL = text(_BLOCK_LIST_QUERY.format(condition="WHERE block_type = :block_type"))
+
+BLOCK_INFO_SQL = text("""
+SELECT block_name, block_type 
+FROM stock_block_membership 
+WHERE block_code = :block_code 
+LIMIT 1
+""")
+
+_BLOCK_STOCKS_QUERY = """
+SELECT 
+    d.stock_code,
+    d.stock_name,
+    CAST(COALESCE(d.close_price, 0) AS DOUBLE) as close_price,
+    CAST(COALESCE(d.change_pct, 0) AS DOUBLE) as change_pct,
+    CAST(COALESCE(d.amount, 0) AS DOUBLE) as amount,
+    CAST(COALESCE(d.volume, 0) AS SIGNED) as volume,
+    CAST(COALESCE(d.turnover_rate, 0) AS DOUBLE) as turnover_rate,
+    CAST(COALESCE(p.net_inflow, 0) AS DOUBLE) as net_inflow,
+    CAST(COALESCE(p.inflow_ratio, 0) AS DOUBLE) as inflow_ratio,
+    CAST(COALESCE(p.large_net_inflow, 0) AS DOUBLE) as large_net_inflow,
+    d.trade_date,
+    bi.block_name,
+    bi.block_type
+FROM stock_block_membership b
+CROSS JOIN (
+    SELECT block_name, block_type 
+    FROM stock_block_membership 
+    WHERE block_code = :block_code 
+    LIMIT 1
+) bi
+INNER JOIN stock_day_data d 
+    ON b.stock_code = d.stock_code
+LEFT JOIN stock_price_distribution p 
+    ON b.stock_code = p.stock_code 
+    AND d.trade_date = p.trade_date
+WHERE b.block_code = :block_code
+  AND d.trade_date = :trade_date
+ORDER BY {sort_condition}
+LIMIT :limit
+"""
+# ORDER BY 不能参数化，按排序字段预先构建各个变体
+BLOCK_STOCKS_SQL = {
+    sort_by: text(_BLOCK_STOCKS_QUERY.format(sort_condition=sort_condition))
+    for sort_by, sort_condition in {
+        "inflow_ratio": "p.inflow_ratio DESC",
+        "net_inflow": "p.net_inflow DESC",
+        "change_pct": "d.change_pct DESC",
+        "amount": "d.amount DESC"
+    }.items()
+}
+
+# 历史数据，最后一行为汇总行（is_summary = 1）
+BLOCK_HISTORY_SQL = text("""
+WITH per_day AS (
+    SELECT 
+        p.trade_date,
+        SUM(p.total_buy_amount) as total_buy,
+        SUM(p.total_sell_amount) as total_sell,
+        SUM(p.net_inflow) as net_inflow,
+        SUM(p.total_amount) as total_amount,
+        CASE WHEN SUM(p.total_amount) > 0 
+             THEN SUM(p.net_inflow) / SUM(p.total_amount) * 100 
+             ELSE 0 END as inflow_ratio,
+        COUNT(DISTINCT p.stock_code) as stock_count
+    FROM stock_block_membership b
+    INNER JOIN stock_price_distribution p 
+        ON b.stock_code = p.stock_code
+    WHERE b.block_code = :block_code
+      AND p.trade_date >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+    GROUP BY p.trade_date
+)
+SELECT 
+    0 as is_summary, trade_date, total_buy, total_sell,
+    net_inflow, total_amount, inflow_ratio, stock_count
+FROM per_day
+UNION ALL
+SELECT 
+    1, NULL, NULL, NULL,
+    COALESCE(SUM(net_inflow), 0), NULL, COALESCE(AVG(inflow_ratio), 0), COUNT(*)
+FROM per_day
+ORDER BY is_summary, trade_date
+""")
+
 
 @router.get("/list")
 async def get_block_list(
         block_type: Optional[str] = Query(None, description="板块类型"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取板块列表"""
     try:
-        query = """
-        SELECT DISTINCT 
-            block_code,
-            block_name,
-            block_type,
-            COUNT(DISTINCT stock_code) as stock_count
-        FROM stock_block_membership
-        """
-
-        params = {}
-        if block_type:
-            query += " WHERE block_type = :block_type"
-            params['block_type'] = block_type
-
-        query += " GROUP BY block_code, block_name, block_type ORDER BY stock_count DESC"
-
-        result = db.execute(query, params).fetchall()
-
-        blocks = []
-        for row in result:
-            blocks.append({
-                'block_code': row.block_code,
-                'block_name': row.block_name,
-                'block_type': row.block_type,
-                'stock_count': row.stock_count
-            })
+        async def load_blocks():
+            if block_type:
+                result = (await db.execute(BLOCK_LIST_BY_TYPE_SQL, {'block_type': block_type})).all()
+            else:
+                result = (await db.execute(BLOCK_LIST_SQL)).all()
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+            blocks = []
+            for row in result:
+                blocks.append({
+                    'block_code': row.block_code,
+                    'block_name': row.block_name,
+                    'block_type': row.block_type,
+                    'stock_count': row.stock_count
+                })
+
+            return {
                 "blocks": blocks,
                 "total_count": len(blocks)
             }
+
+        data = await cache.get_or_set(
+            f"v1:block:list:{block_type or 'all'}",
+            settings.CACHE_TTL_BLOCK_LIST,
+            load_blocks
+        )
+
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
     except Exception as e:
@@ -62,172 +163,140 @@ async def get_block_stocks(
         block_code: str,
         trade_date: Optional[str] = Query(None, description="交易日期"),
         sort_by: str = Query("inflow_ratio", description="排序字段"),
-        limit: int = Query(10, description="返回数量"),
-        db: Session = Depends(get_db)
+        limit: int = Query(10, description="返回数量")
 ):
-    """获取板块内的股票"""
+    """获取板块内的股票（逐行流式输出）"""
+    # 会话由流式生成器负责关闭，不能随依赖在响应发送前释放
+    db = AsyncSessionLocal()
     try:
+        query = BLOCK_STOCKS_SQL.get(sort_by, BLOCK_STOCKS_SQL["inflow_ratio"])
+
+        # 未指定日期时使用最新交易日，表中没有数据时回退为当天
         if not trade_date:
-            # 获取最新交易日
-            date_query = "SELECT MAX(trade_date) as max_date FROM stock_price_distribution"
-            date_result = db.execute(date_query).fetchone()
-            trade_date = date_result.max_date.strftime('%Y-%m-%d') if date_result.max_date else datetime.now().strftime(
-                '%Y-%m-%d')
-
-        # 构建排序条件
-        sort_fields = {
-            "inflow_ratio": "p.inflow_ratio DESC",
-            "net_inflow": "p.net_inflow DESC",
-            "change_pct": "d.change_pct DESC",
-            "amount": "d.amount DESC"
-        }
-        sort_condition = sort_fields.get(sort_by, "p.inflow_ratio DESC")
-
-        query = f"""
-        SELECT 
-            d.stock_code,
-            d.stock_name,
-            d.close_price,
-            d.change_pct,
-            d.amount,
-            d.volume,
-            d.turnover_rate,
-            p.net_inflow,
-            p.inflow_ratio,
-            p.large_net_inflow
-        FROM stock_block_membership b
-        INNER JOIN stock_day_data d 
-            ON b.stock_code = d.stock_code
-        LEFT JOIN stock_price_distribution p 
-            ON b.stock_code = p.stock_code 
-            AND d.trade_date = p.trade_date
-        WHERE b.block_code = :block_code
-          AND d.trade_date = :trade_date
-        ORDER BY {sort_condition}
-        LIMIT :limit
-        """
-
-        result = db.execute(query, {
+            trade_date = await cache.get_latest_trade_date(db) or today_str()
+
+        result = (await db.stream(query, {
             'block_code': block_code,
             'trade_date': trade_date,
             'limit': limit
-        }).fetchall()
-
-        # 获取板块信息
-        block_query = """
-        SELECT block_name, block_type 
-        FROM stock_block_membership 
-        WHERE block_code = :block_code 
-        LIMIT 1
-        """
-
-        block_info = db.execute(block_query, {'block_code': block_code}).fetchone()
-
-        stocks = []
-        for row in result:
-            stocks.append({
-                'stock_code': row.stock_code,
-                'stock_name': row.stock_name,
-                'close_price': float(row.close_price) if row.close_price else 0,
-                'change_pct': float(row.change_pct) if row.change_pct else 0,
-                'amount': float(row.amount) if row.amount else 0,
-                'volume': int(row.volume) if row.volume else 0,
-                'turnover_rate': float(row.turnover_rate) if row.turnover_rate else 0,
-                'net_inflow': float(row.net_inflow) if row.net_inflow else 0,
-                'inflow_ratio': float(row.inflow_ratio) if row.inflow_ratio else 0,
-                'large_net_inflow': float(row.large_net_inflow) if row.large_net_inflow else 0
-            })
+        }, execution_options={'yield_per': STREAM_BATCH_SIZE})).mappings()
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
-                "block_code": block_code,
-                "block_name": block_info.block_name if block_info else "",
-                "block_type": block_info.block_type if block_info else "",
-                "trade_date": trade_date,
-                "stocks": stocks,
-                "count": len(stocks)
-            }
-        }
+        first_row = await result.fetchone()
+
+        if first_row:
+            # 板块信息和实际交易日随股票行一并返回
+            block_info = first_row
+            trade_date = str(first_row['trade_date'])
+        else:
+            # 没有股票数据时单独查询板块信息
+            block_info = (await db.execute(BLOCK_INFO_SQL, {'block_code': block_code})).mappings().first()
 
     except Exception as e:
+        await db.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+    shared_fields = ('trade_date', 'block_name', 'block_type')
+
+    def dump_stock(row) -> bytes:
+        return orjson.dumps({key: value for key, value in row.items() if key not in shared_fields})
+
+    async def generate():
+        try:
+            yield b'{"code":0,"message":"success","data":{"block_code":' + orjson.dumps(block_code) + b',"stocks":['
+
+            count = 0
+            if first_row:
+                yield dump_stock(first_row)
+                count = 1
+                async for row in result:
+                    yield b',' + dump_stock(row)
+                    count += 1
+
+            yield b'],' + orjson.dumps({
+                "block_name": block_info['block_name'] if block_info else "",
+                "block_type": block_info['block_type'] if block_info else "",
+                "trade_date": trade_date,
+                "count": count
+            })[1:] + b'}'
+        finally:
+            await db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
+
 
 @router.get("/{block_code}/history")
 async def get_block_history(
         block_code: str,
+        request: Request,
+        response: Response,
         days: int = Query(30, description="历史天数"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取板块历史资金流向"""
     try:
-        # 获取板块名称
-        block_query = """
-        SELECT block_name, block_type 
-        FROM stock_block_membership 
-        WHERE block_code = :block_code 
-        LIMIT 1
-        """
-        block_info = db.execute(block_query, {'block_code': block_code}).fetchone()
-
-        if not block_info:
-            raise HTTPException(status_code=404, detail="板块不存在")
-
-        # 获取历史数据
-        query = """
-        SELECT 
-            p.trade_date,
-            SUM(p.total_buy_amount) as total_buy,
-            SUM(p.total_sell_amount) as total_sell,
-            SUM(p.net_inflow) as net_inflow,
-            SUM(p.total_amount) as total_amount,
-            COUNT(DISTINCT p.stock_code) as stock_count
-        FROM stock_block_membership b
-        INNER JOIN stock_price_distribution p 
-            ON b.stock_code = p.stock_code
-        WHERE b.block_code = :block_code
-          AND p.trade_date >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
-        GROUP BY p.trade_date
-        ORDER BY p.trade_date
-        """
-
-        result = db.execute(query, {
-            'block_code': block_code,
-            'days': days
-        }).fetchall()
-
-        history = []
-        for row in result:
-            inflow_ratio = (row.net_inflow / row.total_amount * 100
-                            if row.total_amount and row.total_amount > 0 else 0)
-
-            history.append({
-                'date': str(row.trade_date),
-                'total_buy': float(row.total_buy) if row.total_buy else 0,
-                'total_sell': float(row.total_sell) if row.total_sell else 0,
-                'net_inflow': float(row.net_inflow) if row.net_inflow else 0,
-                'total_amount': float(row.total_amount) if row.total_amount else 0,
-                'inflow_ratio': float(inflow_ratio),
-                'stock_count': row.stock_count
-            })
+        # 收盘后历史数据不再变化，按最新交易日、当天日期和参数生成ETag，客户端可直接复用
+        latest_trade_date = await cache.get_latest_trade_date(db)
+        etag = cache.make_etag(latest_trade_date, date.today(), block_code, days)
+        cache_headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={cache.seconds_until_next_close()}"
+        }
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=cache_headers)
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+        async def load_history():
+            # 获取板块名称
+            block_info = (await db.execute(BLOCK_INFO_SQL, {'block_code': block_code})).first()
+
+            if not block_info:
+                raise HTTPException(status_code=404, detail="板块不存在")
+
+            # 获取历史数据
+            result = (await db.execute(BLOCK_HISTORY_SQL, {
+                'block_code': block_code,
+                'days': days
+            })).all()
+
+            *days_rows, summary_row = result
+
+            history = []
+            for row in days_rows:
+                history.append({
+                    'date': str(row.trade_date),
+                    'total_buy': float(row.total_buy) if row.total_buy else 0,
+                    'total_sell': float(row.total_sell) if row.total_sell else 0,
+                    'net_inflow': float(row.net_inflow) if row.net_inflow else 0,
+                    'total_amount': float(row.total_amount) if row.total_amount else 0,
+                    'inflow_ratio': float(row.inflow_ratio),
+                    'stock_count': row.stock_count
+                })
+
+            return {
                 "block_code": block_code,
                 "block_name": block_info.block_name,
                 "block_type": block_info.block_type,
                 "history": history,
                 "summary": {
-                    "total_days": len(history),
-                    "avg_inflow_ratio": sum(h['inflow_ratio'] for h in history) / len(history) if history else 0,
-                    "total_net_inflow": sum(h['net_inflow'] for h in history)
+                    "total_days": summary_row.stock_count,
+                    "avg_inflow_ratio": float(summary_row.inflow_ratio),
+                    "total_net_inflow": float(summary_row.net_inflow)
                 }
             }
+
+        data = await cache.get_or_set(
+            f"v1:block:hist:{block_code}:{days}",
+            cache.seconds_until_next_close(),
+            load_history
+        )
+
+        response.headers.update(cache_headers)
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,12 +1,12 @@
 # backend/app/api/v1/capital.py
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
 from typing import List, Optional
 
 from app.core.database import get_db
 from app.services.analysis_service import CapitalFlowAnalysis
 from app.services.scoring_service import StockScoringModel
+from app.utils.date_utils import today_str
 
 router = APIRouter(prefix="/api/v1/capital", tags=["capital"])
 
@@ -23,18 +23,11 @@ async def get_block_capital_flows(
     获取板块资金流向排名
     """
     if not trade_date:
-        trade_date = datetime.now().strftime('%Y-%m-%d')
+        trade_date = today_str()
 
     try:
         analyzer = CapitalFlowAnalysis(db)
-        results = analyzer.calculate_block_capital_flow(trade_date, days)
-
-        # 过滤板块类型
-        if block_type:
-            results = [r for r in results if r['block_type'] == block_type]
-
-        # 限制返回数量
-        results = results[:limit]
+        results = analyzer.calculate_block_capital_flow(trade_date, days, block_type, limit)
 
         return {
             "code": 0,
@@ -56,6 +49,7 @@ async def get_stock_capital_flow(
         stock_code: str,
         start_date: str = Query(..., description="开始日期"),
         end_date: str = Query(..., description="结束日期"),
+        include_details: bool = Query(True, description="是否返回每日明细"),
         db: Session = Depends(get_db)
 ):
     """
@@ -63,7 +57,7 @@ async def get_stock_capital_flow(
     """
     try:
         analyzer = CapitalFlowAnalysis(db)
-        result = analyzer.analyze_stock_capital_flow(stock_code, start_date, end_date)
+        result = analyzer.analyze_stock_capital_flow(stock_code, start_date, end_date, include_details)
 
         if not result:
             raise HTTPException(status_code=404, detail="未找到数据")
@@ -74,6 +68,8 @@ async def get_stock_capital_flow(
             "data": result
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -81,18 +77,17 @@ async def get_stock_capital_flow(
 @router.get("/stock-score/{stock_code}")
 async def get_stock_score(
         stock_code: str,
-        trade_date: Optional[str] = Query(None, description="交易日期"),
-        db: Session = Depends(get_db)
+        trade_date: Optional[str] = Query(None, description="交易日期")
 ):
     """
     获取股票综合评分
     """
     if not trade_date:
-        trade_date = datetime.now().strftime('%Y-%m-%d')
+        trade_date = today_str()
 
     try:
-        scoring_model = StockScoringModel(db)
-        result = scoring_model.score_stock(stock_code, trade_date)
+        scoring_model = StockScoringModel()
+        result = await scoring_model.score_stock_async(stock_code, trade_date)
 
         return {
             "code": 0,
@@ -115,34 +110,12 @@ async def get_top_stocks(
     获取高评分股票列表
     """
     if not trade_date:
-        trade_date = datetime.now().strftime('%Y-%m-%d')
+        trade_date = today_str()
 
     try:
-        # 这里可以批量评分，简化实现
+        # 单条SQL完成评分、过滤和排序，只返回前limit条
         scoring_model = StockScoringModel(db)
-
-        # 获取当日有交易的股票
-        query = """
-        SELECT DISTINCT stock_code 
-        FROM stock_price_distribution 
-        WHERE trade_date = :date
-        LIMIT 1000
-        """
-
-        stocks = db.execute(query, {'date': trade_date}).fetchall()
-
-        results = []
-        for stock in stocks[:500]:  # 限制数量，避免性能问题
-            try:
-                score_result = scoring_model.score_stock(stock.stock_code, trade_date)
-                if score_result['scores']['total'] >= min_score:
-                    results.append(score_result)
-            except:
-                continue
-
-        # 按总分排序
-        results.sort(key=lambda x: x['scores']['total'], reverse=True)
-        results = results[:limit]
+        results = scoring_model.score_batch_sql(trade_date, min_score, limit)
 
         return {
             "code": 0,
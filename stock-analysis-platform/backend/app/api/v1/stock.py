@@ -1,123 +1,167 @@
 # backend/app/api/v1/stock.py
+import numpy as np
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core import cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db, get_db
 from app.services.cost_analysis_service import HoldingCostAnalysis
 from app.services.scoring_service import StockScoringModel
+from app.utils.date_utils import today_str
 from app.utils.indicators import TechnicalIndicators
 
 router = APIRouter(prefix="/api/v1/stock", tags=["stock"])
 
+# 流式查询每批从数据库读取的行数
+STREAM_BATCH_SIZE = 200
+
+# 预编译的SQL语句（模块加载时构建一次，各请求复用）
+STOCK_DETAILS_SQL = text("""
+SELECT 
+    d.stock_code,
+    d.stock_name,
+    d.trade_date,
+    CAST(COALESCE(d.close_price, 0) AS DOUBLE) as close_price,
+    CAST(COALESCE(d.open_price, 0) AS DOUBLE) as open_price,
+    CAST(COALESCE(d.high_price, 0) AS DOUBLE) as high_price,
+    CAST(COALESCE(d.low_price, 0) AS DOUBLE) as low_price,
+    CAST(COALESCE(d.volume, 0) AS SIGNED) as volume,
+    CAST(COALESCE(d.amount, 0) AS DOUBLE) as amount,
+    CAST(COALESCE(p.net_inflow, 0) AS DOUBLE) as net_inflow,
+    CAST(COALESCE(p.inflow_ratio, 0) AS DOUBLE) as inflow_ratio
+FROM stock_day_data d
+LEFT JOIN stock_price_distribution p 
+    ON d.stock_code = p.stock_code 
+    AND d.trade_date = p.trade_date
+WHERE d.stock_code = :stock_code
+  AND d.trade_date BETWEEN :start_date AND :end_date
+ORDER BY d.trade_date
+""")
+
+# 先按前缀匹配（可走 stock_code / stock_name 索引），
+# 数量不足时再用 %keyword% 补充（前导%无法使用索引，需全表扫描）
+_STOCK_SEARCH_QUERY = """
+SELECT DISTINCT 
+    d.stock_code,
+    d.stock_name,
+    d.market,
+    CAST(COALESCE(d.close_price, 0) AS DOUBLE) as close_price,
+    CAST(COALESCE(d.change_pct, 0) AS DOUBLE) as change_pct,
+    CAST(COALESCE(p.net_inflow, 0) AS DOUBLE) as net_inflow
+FROM stock_day_data d
+LEFT JOIN stock_price_distribution p 
+    ON d.stock_code = p.stock_code 
+    AND d.trade_date = :latest_date
+WHERE {condition}
+ORDER BY d.stock_code
+LIMIT :limit
+"""
+STOCK_SEARCH_PREFIX_SQL = text(_STOCK_SEARCH_QUERY.format(
+    condition="d.stock_code LIKE :prefix OR d.stock_name LIKE :prefix"
+))
+STOCK_SEARCH_CONTAINS_SQL = text(_STOCK_SEARCH_QUERY.format(
+    condition="""(d.stock_code LIKE :keyword OR d.stock_name LIKE :keyword)
+  AND d.stock_code NOT LIKE :prefix 
+  AND d.stock_name NOT LIKE :prefix"""
+))
+
 
 @router.get("/{stock_code}/details")
 async def get_stock_details(
         stock_code: str,
         start_date: Optional[str] = Query(None, description="开始日期"),
-        end_date: Optional[str] = Query(None, description="结束日期"),
-        db: Session = Depends(get_db)
+        end_date: Optional[str] = Query(None, description="结束日期")
 ):
-    """获取股票详细信息"""
+    """获取股票详细信息（价格序列逐行流式输出）"""
+    # 会话由流式生成器负责关闭，不能随依赖在响应发送前释放
+    db = AsyncSessionLocal()
     try:
         # 设置默认日期范围
         if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
+            end_date = today_str()
         if not start_date:
             start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
 
         # 查询股票基本信息
-        query = """
-        SELECT 
-            d.stock_code,
-            d.stock_name,
-            d.trade_date,
-            d.close_price,
-            d.open_price,
-            d.high_price,
-            d.low_price,
-            d.volume,
-            d.amount,
-            d.turnover_rate,
-            d.change_pct,
-            d.ma5,
-            d.ma20,
-            d.ma60,
-            p.net_inflow,
-            p.inflow_ratio,
-            p.large_net_inflow
-        FROM stock_day_data d
-        LEFT JOIN stock_price_distribution p 
-            ON d.stock_code = p.stock_code 
-            AND d.trade_date = p.trade_date
-        WHERE d.stock_code = :stock_code
-          AND d.trade_date BETWEEN :start_date AND :end_date
-        ORDER BY d.trade_date
-        """
-
-        result = db.execute(query, {
+        result = (await db.stream(STOCK_DETAILS_SQL, {
             'stock_code': stock_code,
             'start_date': start_date,
             'end_date': end_date
-        }).fetchall()
-
-        if not result:
-            raise HTTPException(status_code=404, detail="未找到股票数据")
-
-        # 组织数据
-        dates = []
-        prices = []
-        volumes = []
-        inflows = []
-
-        for row in result:
-            dates.append(str(row.trade_date))
-            prices.append({
-                'open': float(row.open_price) if row.open_price else 0,
-                'high': float(row.high_price) if row.high_price else 0,
-                'low': float(row.low_price) if row.low_price else 0,
-                'close': float(row.close_price) if row.close_price else 0,
-                'volume': int(row.volume) if row.volume else 0,
-                'amount': float(row.amount) if row.amount else 0
-            })
-            volumes.append(int(row.volume) if row.volume else 0)
-            inflows.append({
-                'net_inflow': float(row.net_inflow) if row.net_inflow else 0,
-                'inflow_ratio': float(row.inflow_ratio) if row.inflow_ratio else 0
-            })
-
-        # 计算技术指标
-        close_prices = [p['close'] for p in prices]
-        technical_indicators = {
-            'ma5': TechnicalIndicators.calculate_ma(close_prices, 5),
-            'ma20': TechnicalIndicators.calculate_ma(close_prices, 20),
-            'ma60': TechnicalIndicators.calculate_ma(close_prices, 60),
-            'rsi': TechnicalIndicators.calculate_rsi(close_prices, 14)
-        }
+        }, execution_options={'yield_per': STREAM_BATCH_SIZE})).mappings()
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
-                "stock_code": stock_code,
-                "stock_name": result[0].stock_name,
+        first_row = await result.fetchone()
+
+    except Exception as e:
+        await db.close()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not first_row:
+        await db.close()
+        raise HTTPException(status_code=404, detail="未找到股票数据")
+
+    async def generate():
+        try:
+            yield (b'{"code":0,"message":"success","data":{"stock_code":' + orjson.dumps(stock_code)
+                   + b',"stock_name":' + orjson.dumps(first_row['stock_name']) + b',"prices":[')
+
+            # 价格明细直接输出，只保留计算指标和汇总所需的数值序列
+            dates, volumes, close_prices, net_inflows, inflow_ratios = [], [], [], [], []
+            separator = b''
+            row = first_row
+            while row is not None:
+                yield separator + orjson.dumps({
+                    'open': row['open_price'],
+                    'high': row['high_price'],
+                    'low': row['low_price'],
+                    'close': row['close_price'],
+                    'volume': row['volume'],
+                    'amount': row['amount']
+                })
+                separator = b','
+
+                dates.append(str(row['trade_date']))
+                volumes.append(row['volume'])
+                close_prices.append(row['close_price'])
+                net_inflows.append(row['net_inflow'])
+                inflow_ratios.append(row['inflow_ratio'])
+
+                row = await result.fetchone()
+
+            # 计算技术指标
+            closes = np.asarray(close_prices, dtype=np.float64)
+            technical_indicators = {
+                'ma5': TechnicalIndicators.calculate_ma(closes, 5),
+                'ma20': TechnicalIndicators.calculate_ma(closes, 20),
+                'ma60': TechnicalIndicators.calculate_ma(closes, 60),
+                'rsi': TechnicalIndicators.calculate_rsi(closes, 14)
+            }
+
+            yield b'],' + orjson.dumps({
                 "dates": dates,
-                "prices": prices,
                 "volumes": volumes,
-                "inflows": inflows,
+                "inflows": [
+                    {'net_inflow': net_inflow, 'inflow_ratio': inflow_ratio}
+                    for net_inflow, inflow_ratio in zip(net_inflows, inflow_ratios)
+                ],
                 "technical_indicators": technical_indicators,
                 "summary": {
-                    "total_days": len(result),
-                    "avg_volume": sum(volumes) / len(volumes) if volumes else 0,
-                    "total_inflow": sum(inflow['net_inflow'] for inflow in inflows),
-                    "price_change": close_prices[-1] - close_prices[0] if close_prices else 0
+                    "total_days": len(dates),
+                    "avg_volume": sum(volumes) / len(volumes),
+                    "total_inflow": sum(net_inflows),
+                    "price_change": float(closes[-1] - closes[0])
                 }
-            }
-        }
+            }, option=orjson.OPT_SERIALIZE_NUMPY)[1:] + b'}'
+        finally:
+            await db.close()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 @router.get("/{stock_code}/cost-analysis")
@@ -147,16 +191,15 @@ async def get_stock_cost_analysis(
 @router.get("/{stock_code}/score")
 async def get_stock_score(
         stock_code: str,
-        trade_date: Optional[str] = Query(None, description="交易日期"),
-        db: Session = Depends(get_db)
+        trade_date: Optional[str] = Query(None, description="交易日期")
 ):
     """获取股票综合评分"""
     try:
         if not trade_date:
-            trade_date = datetime.now().strftime('%Y-%m-%d')
+            trade_date = today_str()
 
-        scoring_model = StockScoringModel(db)
-        score_result = scoring_model.score_stock(stock_code, trade_date)
+        scoring_model = StockScoringModel()
+        score_result = await scoring_model.score_stock_async(stock_code, trade_date)
 
         return {
             "code": 0,
@@ -177,7 +220,7 @@ async def get_stock_alerts(
     """获取股票预警信息"""
     try:
         if not trade_date:
-            trade_date = datetime.now().strftime('%Y-%m-%d')
+            trade_date = today_str()
 
         from app.services.alert_service import AlertService
         alert_service = AlertService(db)
@@ -202,52 +245,47 @@ async def get_stock_alerts(
 async def search_stocks(
         keyword: str = Query(..., description="搜索关键词（代码或名称）"),
         limit: int = Query(20, description="返回数量"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """搜索股票"""
     try:
-        query = """
-        SELECT DISTINCT 
-            d.stock_code,
-            d.stock_name,
-            d.market,
-            d.close_price,
-            d.change_pct,
-            p.net_inflow
-        FROM stock_day_data d
-        LEFT JOIN stock_price_distribution p 
-            ON d.stock_code = p.stock_code 
-            AND d.trade_date = (SELECT MAX(trade_date) FROM stock_day_data)
-        WHERE d.stock_code LIKE :keyword 
-           OR d.stock_name LIKE :keyword
-        ORDER BY d.stock_code
-        LIMIT :limit
-        """
-
-        result = db.execute(query, {
-            'keyword': f"%{keyword}%",
-            'limit': limit
-        }).fetchall()
-
-        stocks = []
-        for row in result:
-            stocks.append({
-                'stock_code': row.stock_code,
-                'stock_name': row.stock_name,
-                'market': row.market,
-                'close_price': float(row.close_price) if row.close_price else 0,
-                'change_pct': float(row.change_pct) if row.change_pct else 0,
-                'net_inflow': float(row.net_inflow) if row.net_inflow else 0
-            })
+        async def load_stocks():
+            latest_date = await cache.get_latest_trade_date(db, "stock_day_data")
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+            result = (await db.execute(STOCK_SEARCH_PREFIX_SQL, {
+                'latest_date': latest_date,
+                'prefix': f"{keyword}%",
+                'limit': limit
+            })).mappings().all()
+
+            stocks = [dict(row) for row in result]
+
+            if len(stocks) < limit:
+                result = (await db.execute(STOCK_SEARCH_CONTAINS_SQL, {
+                    'latest_date': latest_date,
+                    'keyword': f"%{keyword}%",
+                    'prefix': f"{keyword}%",
+                    'limit': limit - len(stocks)
+                })).mappings().all()
+
+                stocks.extend(dict(row) for row in result)
+
+            return {
                 "keyword": keyword,
                 "stocks": stocks,
                 "count": len(stocks)
             }
+
+        data = await cache.get_or_set(
+            f"v1:stock:search:{keyword}:{limit}",
+            settings.CACHE_TTL_STOCK_SEARCH,
+            load_stocks
+        )
+
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
     except Exception as e:
@@ -1,148 +1,275 @@
 # backend/app/api/v1/strategy.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+import numpy as np
+import pandas as pd
+import pybreaker
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import Float, Integer, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
-from datetime import datetime, timedelta
+from typing import Optional
 
-from app.core.database import get_db
-from app.services.scoring_service import StockScoringModel
+from app.core import cache
+from app.core.database import get_async_db
+from app.services.scoring_service import StockScoringModel, scoring_breaker
+from app.utils.date_utils import today_str
 
 router = APIRouter(prefix="/api/v1/strategy", tags=["strategy"])
 
+# 策略SQL在模块导入时构造一次，绑定参数声明类型，编译结果由SQLAlchemy缓存复用
+# 资金流向策略：近10日连续流入的股票
+CAPITAL_FLOW_SQL = text("""
+WITH recent_flows AS (
+    SELECT 
+        stock_code,
+        trade_date,
+        inflow_ratio,
+        net_inflow,
+        LAG(inflow_ratio) OVER (PARTITION BY stock_code ORDER BY trade_date) as prev_inflow_ratio
+    FROM stock_price_distribution
+    WHERE trade_date BETWEEN DATE_SUB(:trade_date, INTERVAL 10 DAY) AND :trade_date
+),
+continuity_counts AS (
+    SELECT 
+        stock_code,
+        COUNT(*) as positive_days
+    FROM recent_flows
+    WHERE inflow_ratio > :min_inflow_ratio
+    GROUP BY stock_code
+)
+SELECT 
+    d.stock_code,
+    d.stock_name,
+    d.close_price,
+    d.change_pct,
+    p.inflow_ratio,
+    p.net_inflow,
+    c.positive_days,
+    r.prev_inflow_ratio
+FROM stock_day_data d
+INNER JOIN stock_price_distribution p 
+    ON d.stock_code = p.stock_code 
+    AND d.trade_date = p.trade_date
+INNER JOIN recent_flows r 
+    ON d.stock_code = r.stock_code 
+    AND r.trade_date = :trade_date
+INNER JOIN continuity_counts c 
+    ON d.stock_code = c.stock_code
+WHERE d.trade_date = :trade_date
+  AND p.inflow_ratio > :min_inflow_ratio
+  AND c.positive_days >= :min_continuity_days
+ORDER BY p.inflow_ratio DESC
+LIMIT :limit
+""").bindparams(
+    bindparam('min_inflow_ratio', type_=Float),
+    bindparam('min_continuity_days', type_=Integer),
+    bindparam('limit', type_=Integer)
+)
+# 资金流向策略返回字段
+CAPITAL_FLOW_FIELDS = [
+    'stock_code', 'stock_name', 'close_price', 'change_pct', 'inflow_ratio',
+    'net_inflow', 'continuity_days', 'trend'
+]
+
+# 突破策略支持的均线周期，列名不能参数化，按周期预先构建语句
+BREAKOUT_MA_PERIODS = (5, 10, 20, 30, 60)
+_BREAKOUT_QUERY = """
+SELECT 
+    d.stock_code,
+    d.stock_name,
+    d.close_price,
+    d.open_price,
+    d.high_price,
+    d.low_price,
+    d.volume,
+    d.vma{period} as vma,
+    d.change_pct,
+    d.ma{period} as ma,
+    prev.close_price as prev_close
+FROM stock_day_data d
+LEFT JOIN stock_day_data prev 
+    ON prev.stock_code = d.stock_code 
+    AND prev.trade_date = DATE_SUB(:trade_date, INTERVAL 1 DAY)
+WHERE d.trade_date = :trade_date
+  AND d.close_price > d.ma{period}
+  AND d.volume > d.vma{period} * :volume_ratio
+  AND d.close_price > d.open_price  -- 阳线
+ORDER BY (d.close_price - d.ma{period}) / d.ma{period} DESC
+LIMIT :limit
+"""
+BREAKOUT_SQL = {
+    period: text(_BREAKOUT_QUERY.format(period=period)).bindparams(
+        bindparam('volume_ratio', type_=Float),
+        bindparam('limit', type_=Integer)
+    )
+    for period in BREAKOUT_MA_PERIODS
+}
+BREAKOUT_FIELDS = [
+    'stock_code', 'stock_name', 'close_price', 'break_ratio', 'volume_ratio',
+    'change_pct', 'signal_strength'
+]
+
+# 筛选器查询
+SCREENER_SQL = text("""
+SELECT 
+    d.stock_code,
+    d.stock_name,
+    d.close_price,
+    d.change_pct,
+    d.amount,
+    d.turnover_rate,
+    d.volume,
+    p.inflow_ratio,
+    p.net_inflow,
+    d.ma5,
+    d.ma20
+FROM stock_day_data d
+LEFT JOIN stock_price_distribution p 
+    ON d.stock_code = p.stock_code 
+    AND d.trade_date = p.trade_date
+WHERE d.trade_date = :trade_date
+  AND (p.inflow_ratio IS NULL OR p.inflow_ratio >= :min_inflow_ratio)
+  AND d.change_pct >= :min_change_pct
+  AND d.change_pct <= :max_change_pct
+  AND d.amount >= :min_amount
+ORDER BY d.amount DESC
+LIMIT :limit
+""").bindparams(
+    bindparam('min_inflow_ratio', type_=Float),
+    bindparam('min_change_pct', type_=Float),
+    bindparam('max_change_pct', type_=Float),
+    bindparam('min_amount', type_=Float),
+    bindparam('limit', type_=Integer)
+)
+# 筛选器查询列与返回字段
+SCREENER_COLUMNS = [
+    'stock_code', 'stock_name', 'close_price', 'change_pct', 'amount', 'turnover_rate',
+    'volume', 'inflow_ratio', 'net_inflow', 'ma5', 'ma20'
+]
+SCREENER_FIELDS = [
+    'stock_code', 'stock_name', 'close_price', 'change_pct', 'amount', 'turnover_rate',
+    'inflow_ratio', 'net_inflow', 'ma_trend', 'score'
+]
+
+
+def _screener_scores(df: pd.DataFrame) -> np.ndarray:
+    """计算筛选器分数（按列向量化计算，空值已填充为0）"""
+    score = np.full(len(df), 50.0)
+
+    # 资金流入加分
+    score += np.minimum(df['inflow_ratio'] * 10, 20)
+
+    # 成交额加分
+    score += np.where(df['amount'] != 0, np.minimum(np.log10(np.maximum(df['amount'], 1)) - 6, 10), 0)
+
+    # 换手率适中加分
+    score += np.where(df['turnover_rate'].between(2, 10), 5, 0)
+
+    # 均线趋势加分
+    score += np.where(df['ma_trend'] == "up", 10, 0)
+
+    return np.clip(score, 0, 100)
+
 
 @router.get("/top-scoring")
 async def get_top_scoring_stocks(
+        request: Request,
+        response: Response,
         min_score: float = Query(70, description="最低评分"),
         max_count: int = Query(50, description="最大返回数量"),
         trade_date: Optional[str] = Query(None, description="交易日期"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """获取高评分股票"""
     try:
         if not trade_date:
-            trade_date = datetime.now().strftime('%Y-%m-%d')
-
-        scoring_model = StockScoringModel(db)
+            trade_date = today_str()
 
-        # 获取所有股票评分（实际应用中应该分批处理）
-        query = """
-        SELECT DISTINCT stock_code 
-        FROM stock_price_distribution 
-        WHERE trade_date = :trade_date
-        LIMIT 1000
-        """
+        # 历史交易日结果不再变化，客户端携带相同ETag时直接返回304
+        cache_headers = cache.history_cache_headers(trade_date, "top-scoring", min_score, max_count)
+        if cache_headers and request.headers.get("if-none-match") == cache_headers["ETag"]:
+            return Response(status_code=304, headers=cache_headers)
 
-        stocks = db.execute(query, {'trade_date': trade_date}).fetchall()
+        async def load_top_scoring():
+            def load_scores(session: Session):
+                # 评分模型是同步服务，通过 run_sync 在当前异步连接上执行
+                # 评分由调度器每日收盘后写入 stock_scoring_result，这里只做索引查询
+                scoring_model = StockScoringModel(session)
+                return scoring_breaker.call(scoring_model.load_top_scores, trade_date, min_score, max_count)
 
-        results = []
-        for stock in stocks:
             try:
-                score_result = scoring_model.score_stock(stock.stock_code, trade_date)
-                if score_result['scores']['total'] >= min_score:
-                    results.append(score_result)
-            except Exception:
-                continue
+                results = await db.run_sync(load_scores)
+            except pybreaker.CircuitBreakerError:
+                # 熔断打开时快速失败
+                raise HTTPException(status_code=503, detail="评分服务暂不可用，请稍后重试")
 
-        # 按总分排序
-        results.sort(key=lambda x: x['scores']['total'], reverse=True)
-        results = results[:max_count]
-
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+            return {
                 "trade_date": trade_date,
                 "min_score": min_score,
                 "stocks": results,
                 "count": len(results)
             }
+
+        data = await cache.get_or_set(
+            f"v1:strategy:top-scoring:{trade_date}:{min_score}:{max_count}",
+            cache.ttl_for_trade_date(trade_date),
+            load_top_scoring
+        )
+
+        response.headers.update(cache_headers)
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/capital-flow")
 async def capital_flow_strategy(
+        request: Request,
+        response: Response,
         min_inflow_ratio: float = Query(1.0, description="最小流入比例"),
         min_continuity_days: int = Query(3, description="最小连续流入天数"),
         trade_date: Optional[str] = Query(None, description="交易日期"),
         limit: int = Query(20, description="返回数量"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """资金流向策略"""
     try:
         if not trade_date:
-            trade_date = datetime.now().strftime('%Y-%m-%d')
-
-        # 查询连续资金流入的股票
-        query = """
-        WITH recent_flows AS (
-            SELECT 
-                stock_code,
-                trade_date,
-                inflow_ratio,
-                net_inflow,
-                LAG(inflow_ratio) OVER (PARTITION BY stock_code ORDER BY trade_date) as prev_inflow_ratio
-            FROM stock_price_distribution
-            WHERE trade_date BETWEEN DATE_SUB(:trade_date, INTERVAL 10 DAY) AND :trade_date
-        ),
-        continuity_counts AS (
-            SELECT 
-                stock_code,
-                COUNT(*) as positive_days
-            FROM recent_flows
-            WHERE inflow_ratio > :min_inflow_ratio
-            GROUP BY stock_code
-        )
-        SELECT 
-            d.stock_code,
-            d.stock_name,
-            d.close_price,
-            d.change_pct,
-            p.inflow_ratio,
-            p.net_inflow,
-            c.positive_days,
-            (SELECT inflow_ratio FROM stock_price_distribution 
-             WHERE stock_code = d.stock_code 
-               AND trade_date = DATE_SUB(:trade_date, INTERVAL 1 DAY)) as prev_inflow_ratio
-        FROM stock_day_data d
-        INNER JOIN stock_price_distribution p 
-            ON d.stock_code = p.stock_code 
-            AND d.trade_date = p.trade_date
-        INNER JOIN continuity_counts c 
-            ON d.stock_code = c.stock_code
-        WHERE d.trade_date = :trade_date
-          AND p.inflow_ratio > :min_inflow_ratio
-          AND c.positive_days >= :min_continuity_days
-        ORDER BY p.inflow_ratio DESC
-        LIMIT :limit
-        """
-
-        result = db.execute(query, {
-            'trade_date': trade_date,
-            'min_inflow_ratio': min_inflow_ratio,
-            'min_continuity_days': min_continuity_days,
-            'limit': limit
-        }).fetchall()
-
-        stocks = []
-        for row in result:
-            stocks.append({
-                'stock_code': row.stock_code,
-                'stock_name': row.stock_name,
-                'close_price': float(row.close_price) if row.close_price else 0,
-                'change_pct': float(row.change_pct) if row.change_pct else 0,
-                'inflow_ratio': float(row.inflow_ratio) if row.inflow_ratio else 0,
-                'net_inflow': float(row.net_inflow) if row.net_inflow else 0,
-                'continuity_days': row.positive_days,
-                'trend': 'improving' if row.prev_inflow_ratio and row.inflow_ratio > row.prev_inflow_ratio else 'stable'
+            trade_date = today_str()
+
+        # 历史交易日结果不再变化，客户端携带相同ETag时直接返回304
+        cache_headers = cache.history_cache_headers(trade_date, "capital-flow", min_inflow_ratio, min_continuity_days, limit)
+        if cache_headers and request.headers.get("if-none-match") == cache_headers["ETag"]:
+            return Response(status_code=304, headers=cache_headers)
+
+        async def load_capital_flow():
+            # 查询连续资金流入的股票
+            result = await db.execute(CAPITAL_FLOW_SQL, {
+                'trade_date': trade_date,
+                'min_inflow_ratio': min_inflow_ratio,
+                'min_continuity_days': min_continuity_days,
+                'limit': limit
             })
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+            # 整批转换结果行，代替逐行 float(...) 判断
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+            float_columns = ['close_price', 'change_pct', 'inflow_ratio', 'net_inflow', 'prev_inflow_ratio']
+            df[float_columns] = df[float_columns].astype(float).fillna(0)
+
+            df['trend'] = np.where(
+                (df['prev_inflow_ratio'] != 0) & (df['inflow_ratio'] > df['prev_inflow_ratio']),
+                'improving', 'stable'
+            )
+            df = df.rename(columns={'positive_days': 'continuity_days'})
+            stocks = df[CAPITAL_FLOW_FIELDS].to_dict('records')
+
+            return {
                 "strategy_name": "资金连续流入策略",
                 "trade_date": trade_date,
                 "parameters": {
@@ -152,79 +279,75 @@ async def capital_flow_strategy(
                 "stocks": stocks,
                 "count": len(stocks)
             }
+
+        data = await cache.get_or_set(
+            f"v1:strategy:capital-flow:{trade_date}:{min_inflow_ratio}:{min_continuity_days}:{limit}",
+            cache.ttl_for_trade_date(trade_date),
+            load_capital_flow
+        )
+
+        response.headers.update(cache_headers)
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/breakout")
 async def breakout_strategy(
+        request: Request,
+        response: Response,
         ma_period: int = Query(20, description="均线周期"),
         volume_ratio: float = Query(1.2, description="量比阈值"),
         trade_date: Optional[str] = Query(None, description="交易日期"),
         limit: int = Query(20, description="返回数量"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """突破策略"""
+    if ma_period not in BREAKOUT_SQL:
+        raise HTTPException(status_code=400, detail=f"不支持的均线周期，可选：{sorted(BREAKOUT_SQL)}")
+
     try:
         if not trade_date:
-            trade_date = datetime.now().strftime('%Y-%m-%d')
-
-        # 查询突破均线的股票
-        query = f"""
-        SELECT 
-            d.stock_code,
-            d.stock_name,
-            d.close_price,
-            d.open_price,
-            d.high_price,
-            d.low_price,
-            d.volume,
-            d.vma{ma_period},
-            d.change_pct,
-            d.ma{ma_period},
-            (SELECT close_price FROM stock_day_data 
-             WHERE stock_code = d.stock_code 
-               AND trade_date = DATE_SUB(:trade_date, INTERVAL 1 DAY)) as prev_close
-        FROM stock_day_data d
-        WHERE d.trade_date = :trade_date
-          AND d.close_price > d.ma{ma_period}
-          AND d.volume > d.vma{ma_period} * :volume_ratio
-          AND d.close_price > d.open_price  -- 阳线
-        ORDER BY (d.close_price - d.ma{ma_period}) / d.ma{ma_period} DESC
-        LIMIT :limit
-        """
-
-        result = db.execute(query, {
-            'trade_date': trade_date,
-            'volume_ratio': volume_ratio,
-            'limit': limit
-        }).fetchall()
-
-        stocks = []
-        for row in result:
-            volume_ratio_value = row.volume / row[f'vma{ma_period}'] if row[f'vma{ma_period}'] and row[
-                f'vma{ma_period}'] > 0 else 0
-            break_ratio = (row.close_price - row[f'ma{ma_period}']) / row[f'ma{ma_period}'] * 100 if row[
-                                                                                                         f'ma{ma_period}'] and \
-                                                                                                     row[
-                                                                                                         f'ma{ma_period}'] > 0 else 0
-
-            stocks.append({
-                'stock_code': row.stock_code,
-                'stock_name': row.stock_name,
-                'close_price': float(row.close_price) if row.close_price else 0,
-                'break_ratio': float(break_ratio),
-                'volume_ratio': float(volume_ratio_value),
-                'change_pct': float(row.change_pct) if row.change_pct else 0,
-                'signal_strength': min(10, int(abs(break_ratio) * 2 + volume_ratio_value))
+            trade_date = today_str()
+
+        # 历史交易日结果不再变化，客户端携带相同ETag时直接返回304
+        cache_headers = cache.history_cache_headers(trade_date, "breakout", ma_period, volume_ratio, limit)
+        if cache_headers and request.headers.get("if-none-match") == cache_headers["ETag"]:
+            return Response(status_code=304, headers=cache_headers)
+
+        async def load_breakout():
+            # 查询突破均线的股票
+            result = await db.execute(BREAKOUT_SQL[ma_period], {
+                'trade_date': trade_date,
+                'volume_ratio': volume_ratio,
+                'limit': limit
             })
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+            # 整批计算突破幅度、量比和信号强度
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+            float_columns = ['close_price', 'change_pct', 'volume', 'vma', 'ma']
+            df[float_columns] = df[float_columns].astype(float).fillna(0)
+
+            # 直接在 ndarray 上计算，分母为0的行保持为0
+            close = df['close_price'].to_numpy()
+            ma = df['ma'].to_numpy()
+            vma = df['vma'].to_numpy()
+            volume_ratios = np.divide(df['volume'].to_numpy(), vma, out=np.zeros(len(df)), where=vma > 0)
+            break_ratios = np.divide(close - ma, ma, out=np.zeros(len(df)), where=ma > 0) * 100
+
+            df['volume_ratio'] = volume_ratios
+            df['break_ratio'] = break_ratios
+            df['signal_strength'] = np.minimum(10, np.abs(break_ratios) * 2 + volume_ratios).astype(int)
+            stocks = df[BREAKOUT_FIELDS].to_dict('records')
+
+            return {
                 "strategy_name": f"MA{ma_period}突破策略",
                 "trade_date": trade_date,
                 "parameters": {
@@ -234,86 +357,72 @@ async def breakout_strategy(
                 "stocks": stocks,
                 "count": len(stocks)
             }
+
+        data = await cache.get_or_set(
+            f"v1:strategy:breakout:{trade_date}:{ma_period}:{volume_ratio}:{limit}",
+            cache.ttl_for_trade_date(trade_date),
+            load_breakout
+        )
+
+        response.headers.update(cache_headers)
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/screener")
 async def stock_screener(
+        request: Request,
+        response: Response,
         min_inflow_ratio: float = Query(0, description="最小流入比例"),
         min_change_pct: float = Query(-10, description="最小涨跌幅"),
         max_change_pct: float = Query(10, description="最大涨跌幅"),
         min_amount: float = Query(10000000, description="最小成交额"),
         trade_date: Optional[str] = Query(None, description="交易日期"),
         limit: int = Query(50, description="返回数量"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """股票筛选器"""
     try:
         if not trade_date:
-            trade_date = datetime.now().strftime('%Y-%m-%d')
-
-        query = """
-        SELECT 
-            d.stock_code,
-            d.stock_name,
-            d.close_price,
-            d.change_pct,
-            d.amount,
-            d.turnover_rate,
-            d.volume,
-            p.inflow_ratio,
-            p.net_inflow,
-            d.ma5,
-            d.ma20
-        FROM stock_day_data d
-        LEFT JOIN stock_price_distribution p 
-            ON d.stock_code = p.stock_code 
-            AND d.trade_date = p.trade_date
-        WHERE d.trade_date = :trade_date
-          AND (p.inflow_ratio IS NULL OR p.inflow_ratio >= :min_inflow_ratio)
-          AND d.change_pct >= :min_change_pct
-          AND d.change_pct <= :max_change_pct
-          AND d.amount >= :min_amount
-        ORDER BY d.amount DESC
-        LIMIT :limit
-        """
-
-        result = db.execute(query, {
-            'trade_date': trade_date,
-            'min_inflow_ratio': min_inflow_ratio,
-            'min_change_pct': min_change_pct,
-            'max_change_pct': max_change_pct,
-            'min_amount': min_amount,
-            'limit': limit
-        }).fetchall()
-
-        stocks = []
-        for row in result:
-            ma_trend = "up" if row.ma5 and row.ma20 and row.ma5 > row.ma20 else "down"
-
-            stocks.append({
-                'stock_code': row.stock_code,
-                'stock_name': row.stock_name,
-                'close_price': float(row.close_price) if row.close_price else 0,
-                'change_pct': float(row.change_pct) if row.change_pct else 0,
-                'amount': float(row.amount) if row.amount else 0,
-                'turnover_rate': float(row.turnover_rate) if row.turnover_rate else 0,
-                'inflow_ratio': float(row.inflow_ratio) if row.inflow_ratio else 0,
-                'net_inflow': float(row.net_inflow) if row.net_inflow else 0,
-                'ma_trend': ma_trend,
-                'score': self._calculate_screener_score(row)
-            })
-
-        # 按分数排序
-        stocks.sort(key=lambda x: x['score'], reverse=True)
+            trade_date = today_str()
 
-        return {
-            "code": 0,
-            "message": "success",
-            "data": {
+        # 历史交易日结果不再变化，客户端携带相同ETag时直接返回304
+        cache_headers = cache.history_cache_headers(
+            trade_date, "screener", min_inflow_ratio, min_change_pct, max_change_pct, min_amount, limit
+        )
+        if cache_headers and request.headers.get("if-none-match") == cache_headers["ETag"]:
+            return Response(status_code=304, headers=cache_headers)
+
+        async def load_screener():
+            result = (await db.execute(SCREENER_SQL, {
+                'trade_date': trade_date,
+                'min_inflow_ratio': min_inflow_ratio,
+                'min_change_pct': min_change_pct,
+                'max_change_pct': max_change_pct,
+                'min_amount': min_amount,
+                'limit': limit
+            })).fetchall()
+
+            df = pd.DataFrame(result, columns=SCREENER_COLUMNS)
+            numeric_columns = SCREENER_COLUMNS[2:]
+            df[numeric_columns] = df[numeric_columns].astype(float).fillna(0)
+
+            df['ma_trend'] = np.where((df['ma5'] != 0) & (df['ma20'] != 0) & (df['ma5'] > df['ma20']), "up", "down")
+            df['score'] = _screener_scores(df)
+
+            # 按分数排序
+            df = df.sort_values('score', ascending=False, kind='stable')
+            stocks = df[SCREENER_FIELDS].to_dict('records')
+
+            return {
                 "trade_date": trade_date,
                 "filters": {
                     "min_inflow_ratio": min_inflow_ratio,
@@ -324,30 +433,21 @@ async def stock_screener(
                 "stocks": stocks,
                 "count": len(stocks)
             }
+
+        data = await cache.get_or_set(
+            f"v1:strategy:screener:{trade_date}:{min_inflow_ratio}:{min_change_pct}:{max_change_pct}:{min_amount}:{limit}",
+            cache.ttl_for_trade_date(trade_date),
+            load_screener
+        )
+
+        response.headers.update(cache_headers)
+        return {
+            "code": 0,
+            "message": "success",
+            "data": data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    def _calculate_screener_score(self, row) -> float:
-        """计算筛选器分数"""
-        score = 50.0
-
-        # 资金流入加分
-        if row.inflow_ratio:
-            score += min(row.inflow_ratio * 10, 20)
-
-        # 成交额加分
-        if row.amount:
-            score += min(np.log10(max(row.amount, 1)) - 6, 10)
-
-        # 换手率适中加分
-        if row.turnover_rate and 2 <= row.turnover_rate <= 10:
-            score += 5
-
-        # 均线趋势加分
-        if hasattr(row, 'ma5') and hasattr(row, 'ma20'):
-            if row.ma5 and row.ma20 and row.ma5 > row.ma20:
-                score += 10
-
-        return min(max(score, 0), 100)
\ No newline at end of file
@@ -1,6 +1,6 @@
 # backend/app/core/__init__.py
 from .config import settings
-from .database import SessionLocal, engine, Base
+from .database import SessionLocal, engine, AsyncSessionLocal, async_engine, Base
 from .security import verify_token, create_access_token
 
-__all__ = ["settings", "SessionLocal", "engine", "Base", "verify_token", "create_access_token"]
\ No newline at end of file
+__all__ = ["settings", "SessionLocal", "engine", "AsyncSessionLocal", "async_engine", "Base", "verify_token", "create_access_token"]
\ No newline at end of file
@@ -0,0 +1,179 @@
+# backend/app/core/cache.py
+import hashlib
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.date_utils import today_str
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis客户端（延迟创建，未配置REDIS_URL时不启用缓存）
+_redis_client: Optional[aioredis.Redis] = None
+
+# 与 ORJSONResponse 保持一致的序列化选项（支持numpy数值和非字符串key）
+CACHE_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# 最新交易日的进程内缓存：{表名: (过期时间, 交易日)}
+_latest_trade_dates: Dict[str, Tuple[float, Optional[date]]] = {}
+
+LATEST_TRADE_DATE_SQL = {
+    "stock_day_data": text("SELECT MAX(trade_date) FROM stock_day_data"),
+    "stock_price_distribution": text("SELECT MAX(trade_date) FROM stock_price_distribution")
+}
+
+
+def create_redis() -> Optional[aioredis.Redis]:
+    """新建一个Redis客户端，未配置REDIS_URL时返回None"""
+    if not settings.REDIS_URL:
+        return None
+    return aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """
+    获取进程共享的Redis客户端
+
+    连接池绑定首次使用时的事件循环，只适用于应用进程内的单个事件循环；
+    调度器等多次 asyncio.run 的场景应使用 create_redis 在同一事件循环内创建并关闭客户端
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = create_redis()
+    return _redis_client
+
+
+async def get_or_set(key: str, ttl: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    旁路缓存：命中直接返回，未命中时调用loader加载并写入缓存
+
+    key命名规则：service:entity:identifier:variant，例如 v1:block:list:all
+    """
+    client = get_redis()
+    if client is None:
+        return await loader()
+
+    try:
+        cached = await client.get(key)
+        if cached is not None:
+            return orjson.loads(cached)
+    except RedisError as e:
+        logger.warning(f"读取缓存 {key} 失败: {e}")
+
+    value = await loader()
+
+    try:
+        await client.set(key, orjson.dumps(value, option=CACHE_JSON_OPTIONS), ex=ttl)
+    except RedisError as e:
+        logger.warning(f"写入缓存 {key} 失败: {e}")
+
+    return value
+
+
+async def get_many(keys: List[str]) -> List[Optional[Any]]:
+    """批量读取缓存（一次MGET），未命中或未启用缓存的位置为None"""
+    client = get_redis()
+    if client is None or not keys:
+        return [None] * len(keys)
+
+    try:
+        return [orjson.loads(cached) if cached is not None else None
+                for cached in await client.mget(keys)]
+    except RedisError as e:
+        logger.warning(f"批量读取缓存失败: {e}")
+        return [None] * len(keys)
+
+
+async def set_many(values: Dict[str, Any], ttl: int) -> None:
+    """批量写入缓存，一个pipeline一次往返"""
+    client = get_redis()
+    if client is None or not values:
+        return
+
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, orjson.dumps(value, option=CACHE_JSON_OPTIONS), ex=ttl)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"批量写入缓存失败: {e}")
+
+
+async def invalidate(pattern: str, client: Optional[aioredis.Redis] = None) -> int:
+    """按模式删除缓存，返回删除的key数量；未传入client时使用共享客户端"""
+    client = client or get_redis()
+    if client is None:
+        return 0
+
+    try:
+        keys = [key async for key in client.scan_iter(match=pattern, count=500)]
+        if keys:
+            await client.delete(*keys)
+        return len(keys)
+    except RedisError as e:
+        logger.warning(f"清理缓存 {pattern} 失败: {e}")
+        return 0
+
+
+def seconds_until_next_close(now: Optional[datetime] = None) -> int:
+    """距离下一个交易日收盘的秒数（按工作日计算）"""
+    now = now or datetime.now()
+    close_at = now.replace(hour=settings.MARKET_CLOSE_HOUR, minute=0, second=0, microsecond=0)
+
+    if close_at <= now:
+        close_at += timedelta(days=1)
+    while close_at.weekday() >= 5:  # 跳过周六、周日
+        close_at += timedelta(days=1)
+
+    return max(int((close_at - now).total_seconds()), 1)
+
+
+def ttl_for_trade_date(trade_date: str) -> int:
+    """按交易日确定缓存时间：历史交易日数据不再变化，当天数据只短暂缓存"""
+    if trade_date < today_str():
+        return settings.CACHE_TTL_HISTORY
+    return settings.CACHE_TTL_TODAY
+
+
+def make_etag(*parts: Any) -> str:
+    """根据决定响应内容的参数生成ETag"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def history_cache_headers(trade_date: str, *parts: Any) -> Dict[str, str]:
+    """
+    历史交易日响应的HTTP缓存头：结果不再变化，浏览器/代理可长期缓存
+
+    当天（或未来）交易日返回空字典，不设置缓存头
+    """
+    if trade_date >= today_str():
+        return {}
+    return {
+        "ETag": make_etag(*parts, trade_date),
+        "Cache-Control": f"public, max-age={settings.CACHE_TTL_HISTORY}, immutable"
+    }
+
+
+async def get_latest_trade_date(db: AsyncSession, table: str = "stock_price_distribution") -> Optional[date]:
+    """
+    获取表中最新交易日，进程内缓存 CACHE_TTL_LATEST_TRADE_DATE 秒
+
+    调度器在独立进程中运行，新交易日数据写入后依靠过期时间刷新
+    """
+    now = time.monotonic()
+    cached = _latest_trade_dates.get(table)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    latest = (await db.execute(LATEST_TRADE_DATE_SQL[table])).scalar()
+    _latest_trade_dates[table] = (now + settings.CACHE_TTL_LATEST_TRADE_DATE, latest)
+    return latest
@@ -1,21 +1,52 @@
 # backend/app/core/database.py
+import asyncio
+import logging
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import settings
 
+logger = logging.getLogger(__name__)
+
 # 创建数据库引擎
 engine = create_engine(
     settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=True,
-    pool_recycle=3600,
+    pool_use_lifo=True,
     echo=settings.DEBUG
 )
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步数据库引擎（异步引擎必须使用AsyncAdaptedQueuePool）
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    echo=settings.DEBUG
+)
+
+# 创建异步会话工厂
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # 声明基类
 Base = declarative_base()
 
@@ -25,4 +56,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def monitor_pool_status(interval: int = 60):
+    """定期记录连接池状态，用于调优连接池大小"""
+    while True:
+        logger.info(f"同步连接池: {engine.pool.status()}")
+        logger.info(f"异步连接池: {async_engine.pool.status()}")
+        await asyncio.sleep(interval)
\ No newline at end of file
@@ -1,24 +1,27 @@
 # backend/app/main.py
 
+import asyncio
 import sys
 import os
 from fastapi import FastAPI, Request, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from backend.app.core.config import settings
-from backend.app.core.database import get_db
+from backend.app.core.database import monitor_pool_status
 from backend.app.api.v1 import capital, stock, block, strategy
+from backend.app.utils.date_utils import get_today
 
 # 创建FastAPI应用
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None
 )
@@ -47,19 +50,19 @@ app.include_router(strategy.router, prefix=settings.API_V1_STR)
 
 # Web页面路由
 @app.get("/")
-async def index(request: Request, db: Session = Depends(get_db)):
+async def index(request: Request, today: str = Depends(get_today)):
     """首页"""
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "today": datetime.now().strftime('%Y-%m-%d')}
+        {"request": request, "today": today}
     )
 
 @app.get("/capital")
-async def capital_page(request: Request):
+async def capital_page(request: Request, today: str = Depends(get_today)):
     """资金流向页面"""
     return templates.TemplateResponse(
         "capital.html",
-        {"request": request, "today": datetime.now().strftime('%Y-%m-%d')}
+        {"request": request, "today": today}
     )
 
 @app.get("/stock")
@@ -71,19 +74,19 @@ async def stock_page(request: Request):
     )
 
 @app.get("/strategy")
-async def strategy_page(request: Request):
+async def strategy_page(request: Request, today: str = Depends(get_today)):
     """策略页面"""
     return templates.TemplateResponse(
         "strategy.html",
-        {"request": request, "today": datetime.now().strftime('%Y-%m-%d')}
+        {"request": request, "today": today}
     )
 
 @app.get("/dashboard")
-async def dashboard_page(request: Request):
+async def dashboard_page(request: Request, today: str = Depends(get_today)):
     """仪表板页面"""
     return templates.TemplateResponse(
         "dashboard.html",
-        {"request": request, "today": datetime.now().strftime('%Y-%m-%d')}
+        {"request": request, "today": today}
     )
 
 @app.get("/block/{block_code}/stocks")
@@ -104,10 +107,12 @@ async def startup_event():
     """应用启动事件"""
     print(f"🚀 {settings.PROJECT_NAME} v{settings.PROJECT_VERSION} 启动成功!")
     print(f"📊 数据库: {settings.DATABASE_URL}")
+    app.state.pool_monitor = asyncio.create_task(monitor_pool_status())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
+    app.state.pool_monitor.cancel()
     print("👋 应用关闭")
 
 if __name__ == "__main__":
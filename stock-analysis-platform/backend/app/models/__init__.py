@@ -1,11 +1,12 @@
 # backend/app/models/__init__.py
 from .capital_flow import BlockCapitalFlow, HoldingCostAnalysis
-from .stock_analysis import StockScoringResult
+from .stock_analysis import StockDailyFeatures, StockScoringResult
 from .scoring_model import ScoringWeights
 
 __all__ = [
     "BlockCapitalFlow",
     "HoldingCostAnalysis",
     "StockScoringResult",
+    "StockDailyFeatures",
     "ScoringWeights"
 ]
\ No newline at end of file
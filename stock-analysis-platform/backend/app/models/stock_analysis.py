@@ -1,7 +1,8 @@
 # backend/app/models/stock_analysis.py
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, JSON, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, JSON, Enum, Index, UniqueConstraint
 from sqlalchemy.dialects.mysql import DECIMAL
 import enum
+from datetime import datetime
 
 from app.core.database import Base
 
@@ -36,5 +37,23 @@ class StockScoringResult(Base):
     created_at = Column(DateTime, default=lambda: datetime.now())
 
     __table_args__ = (
+        UniqueConstraint("trade_date", "stock_code", name="uk_scoring_date_code"),
+        Index("idx_scoring_date_total", "trade_date", "total_score"),
         {"comment": "股票综合评分结果表"},
+    )
+
+
+class StockDailyFeatures(Base):
+    """股票日度评分特征模型（调度器每日收盘后刷新，评分查询直接按主键读取）"""
+    __tablename__ = "stock_daily_features"
+
+    stock_code = Column(String(10), primary_key=True, comment="股票代码")
+    trade_date = Column(Date, primary_key=True, comment="交易日期")
+    volatility_20d = Column(Float, comment="近20日涨跌幅标准差")
+    positive_days_5d = Column(Integer, default=0, comment="近5日净流入天数")
+    updated_at = Column(DateTime, default=lambda: datetime.now())
+
+    __table_args__ = (
+        Index("idx_features_date", "trade_date"),
+        {"comment": "股票日度评分特征表"},
     )
\ No newline at end of file
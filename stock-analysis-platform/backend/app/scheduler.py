@@ -2,14 +2,16 @@
 """
 数据更新调度器
 """
+import asyncio
 import schedule
 import time
 from datetime import datetime, timedelta
 import logging
+from typing import Tuple
 from sqlalchemy.orm import Session
 
+from app.core import cache
 from app.core.database import SessionLocal
-from app.services.analysis_service import CapitalFlowAnalysis
 from app.services.scoring_service import StockScoringModel
 
 # 配置日志
@@ -19,50 +21,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 批量评分时每批读取、写入的股票数
+SCORING_BATCH_SIZE = 500
 
-def update_daily_analysis():
-    """每日收盘后更新分析数据"""
-    db = SessionLocal()
-    try:
-        # 获取最近交易日（假设T+1数据）
-        trade_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
 
-        logger.info(f"开始更新 {trade_date} 的分析数据...")
+async def invalidate_caches(patterns: Tuple[Tuple[str, str], ...]) -> None:
+    """
+    在同一个事件循环内按模式清理缓存
 
-        # 更新板块资金流向
-        analyzer = CapitalFlowAnalysis(db)
-        analyzer.calculate_and_store_block_flows(trade_date)
-
-        logger.info("板块资金流向分析完成")
-
-        # 批量更新股票评分
-        scoring_model = StockScoringModel(db)
+    Redis客户端在本次事件循环内创建并关闭：共享客户端的连接池绑定首次使用的事件循环，
+    跨多次 asyncio.run 复用会报 Event loop is closed
+    """
+    client = cache.create_redis()
+    if client is None:
+        return
 
-        # 获取当日有交易的股票
-        query = """
-        SELECT DISTINCT stock_code 
-        FROM stock_price_distribution 
-        WHERE trade_date = :trade_date
-        LIMIT 100  # 测试时限制数量
-        """
-
-        stocks = db.execute(query, {'trade_date': trade_date}).fetchall()
-
-        for i, stock in enumerate(stocks, 1):
+    try:
+        for pattern, name in patterns:
             try:
-                scoring_model.score_and_store(stock.stock_code, trade_date)
-                if i % 10 == 0:
-                    logger.info(f"已评分 {i}/{len(stocks)} 只股票")
+                removed = await cache.invalidate(pattern, client)
+                logger.info(f"已清理 {removed} 条{name}缓存")
             except Exception as e:
-                logger.error(f"评分股票 {stock.stock_code} 失败: {e}")
+                logger.error(f"清理{name}缓存失败: {e}")
+    finally:
+        await client.aclose()
 
-        logger.info(f"成功更新 {trade_date} 的分析数据")
 
-    except Exception as e:
-        logger.error(f"更新分析数据失败: {e}")
+def update_daily_analysis():
+    """每日收盘后更新分析数据，各阶段独立捕获异常，一个阶段失败不影响后续阶段"""
+    # 获取最近交易日（假设T+1数据）
+    trade_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+    logger.info(f"开始更新 {trade_date} 的分析数据...")
+
+    db = SessionLocal()
+    try:
+        scoring_model = StockScoringModel(db)
+
+        # 板块资金流向由接口在SQL中按需计算，无需预先写入；新数据入库后只需清理板块缓存（见下方）
+
+        # 刷新评分窗口特征；失败时评分SQL回退到实时窗口聚合，仍可继续评分
+        try:
+            scoring_model.refresh_daily_features(trade_date)
+            logger.info("评分窗口特征刷新完成")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"刷新评分窗口特征失败: {e}")
+
+        # 全市场评分并写入 stock_scoring_result，高分股票接口直接读取
+        try:
+            stored = scoring_model.store_scores(trade_date, SCORING_BATCH_SIZE)
+            logger.info(f"已评分 {stored} 只股票")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"全市场评分失败: {e}")
     finally:
         db.close()
 
+    # 数据已刷新，清理板块缓存、该交易日的策略缓存和单只股票评分缓存
+    try:
+        asyncio.run(invalidate_caches((
+            ("v1:block:*", "板块"),
+            (f"v1:strategy:*:{trade_date}:*", "策略"),
+            (f"v1:score:*:{trade_date}", "评分")
+        )))
+    except Exception as e:
+        logger.error(f"清理缓存失败: {e}")
+
+    logger.info(f"{trade_date} 的分析数据更新结束")
+
 
 def update_holding_cost_analysis():
     """更新持股成本分析"""
@@ -1,4 +1,36 @@
 # backend/app/services/alert_service.py
+from typing import Dict, List
+
+from sqlalchemy import Float, String, bindparam, text
+from sqlalchemy.orm import Session
+
+# 资金面预警数据：当日与前一日资金流向，LAG 取前一日净流入，一次查询覆盖多只股票
+# 依赖 stock_price_distribution 的 (stock_code, trade_date) 复合索引做范围扫描；
+# 语句在模块加载时构建一次并声明结果列类型，SQLAlchemy 按语句对象缓存编译结果，批量检查不再重复解析
+CAPITAL_ALERT_SQL = text("""
+SELECT stock_code, net_inflow, large_net_inflow, inflow_ratio, prev_inflow
+FROM (
+    SELECT 
+        stock_code,
+        trade_date,
+        net_inflow,
+        large_net_inflow,
+        inflow_ratio,
+        LAG(net_inflow) OVER (PARTITION BY stock_code ORDER BY trade_date) as prev_inflow
+    FROM stock_price_distribution
+    WHERE stock_code IN :codes 
+      AND trade_date BETWEEN DATE_SUB(:date, INTERVAL 1 DAY) AND :date
+) t
+WHERE trade_date = :date
+""").bindparams(bindparam('codes', expanding=True)).columns(
+    stock_code=String,
+    net_inflow=Float,
+    large_net_inflow=Float,
+    inflow_ratio=Float,
+    prev_inflow=Float
+)
+
+
 class AlertService:
     """股票预警服务"""
 
@@ -25,29 +57,31 @@ class AlertService:
 
     def _check_capital_alerts(self, stock_code: str, trade_date: str) -> List[Dict]:
         """检查资金面预警"""
-        alerts = []
+        return self.check_capital_alerts_bulk([stock_code], trade_date)[stock_code]
 
-        # 查询最近资金流向
-        query = """
-        SELECT 
-            net_inflow,
-            large_net_inflow,
-            inflow_ratio,
-            (SELECT net_inflow FROM stock_price_distribution 
-             WHERE stock_code = :stock_code 
-               AND trade_date = DATE_SUB(:date, INTERVAL 1 DAY)) as prev_inflow
-        FROM stock_price_distribution
-        WHERE stock_code = :stock_code 
-          AND trade_date = :date
+    def check_capital_alerts_bulk(self, stock_codes: List[str], trade_date: str) -> Dict[str, List[Dict]]:
         """
+        批量检查资金面预警，所有股票只查询一次
 
-        result = self.db.execute(query, {
-            'stock_code': stock_code,
+        返回 {stock_code: [alert, ...]}，无数据的股票为空列表
+        """
+        alerts = {code: [] for code in stock_codes}
+        if not stock_codes:
+            return alerts
+
+        result = self.db.execute(CAPITAL_ALERT_SQL, {
+            'codes': list(stock_codes),
             'date': trade_date
-        }).fetchone()
+        })
 
-        if not result:
-            return alerts
+        for row in result:
+            alerts[row.stock_code] = self._capital_alerts_from_row(row)
+
+        return alerts
+
+    def _capital_alerts_from_row(self, result) -> List[Dict]:
+        """根据单只股票的资金流向数据生成资金面预警"""
+        alerts = []
 
         # 资金大幅流出预警
         if result.net_inflow < -10000000:  # 净流出超过1000万
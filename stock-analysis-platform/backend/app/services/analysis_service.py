@@ -1,10 +1,122 @@
 # backend/app/services/analysis_service.py
 import json
 import numpy as np
+from itertools import groupby
+from operator import itemgetter
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_
+from sqlalchemy import func, desc, and_, or_, text
+
+from app.utils.data_processor import DataProcessor
+
+# 板块资金流向：按日汇总、按平均流入比例取前 limit 个板块（LIMIT 在数据库执行，
+# 最多返回 limit × days 行）、连续净流入天数都在SQL中完成，结果已按最终顺序排好；
+# 用到的金额/比例列转为DOUBLE返回
+BLOCK_FLOW_SQL = text("""
+WITH daily AS (
+    SELECT 
+        b.block_code,
+        b.block_name,
+        b.block_type,
+        p.trade_date,
+        SUM(p.total_buy_amount) as total_buy,
+        SUM(p.total_sell_amount) as total_sell,
+        SUM(p.net_inflow) as net_inflow,
+        SUM(p.total_amount) as total_amount,
+        CASE WHEN SUM(p.total_amount) > 0 
+             THEN SUM(p.net_inflow) / SUM(p.total_amount) * 100 
+             ELSE 0 END as inflow_ratio,
+        COUNT(DISTINCT p.stock_code) as stock_count,
+        SUM(CASE WHEN p.net_inflow > 0 THEN 1 ELSE 0 END) as inflow_stocks
+    FROM stock_block_membership b
+    INNER JOIN stock_price_distribution p 
+        ON b.stock_code = p.stock_code
+    WHERE p.trade_date BETWEEN :start_date AND :end_date
+      AND (:block_type IS NULL OR b.block_type = :block_type)
+    GROUP BY b.block_code, b.block_name, b.block_type, p.trade_date
+),
+top_blocks AS (
+    SELECT block_code
+    FROM daily
+    GROUP BY block_code
+    ORDER BY AVG(inflow_ratio) DESC, block_code
+    LIMIT :limit
+),
+ranked AS (
+    SELECT 
+        d.*,
+        ROW_NUMBER() OVER (PARTITION BY d.block_code ORDER BY d.trade_date DESC) as day_rank,
+        AVG(d.inflow_ratio) OVER (PARTITION BY d.block_code) as avg_inflow_ratio,
+        COUNT(*) OVER (PARTITION BY d.block_code) as day_count
+    FROM daily d
+    INNER JOIN top_blocks t 
+        ON d.block_code = t.block_code
+)
+SELECT 
+    block_code,
+    block_name,
+    block_type,
+    DATE_FORMAT(trade_date, '%Y-%m-%d') as trade_date,
+    total_buy,
+    total_sell,
+    CAST(net_inflow AS DOUBLE) as net_inflow,
+    CAST(total_amount AS DOUBLE) as total_amount,
+    CAST(inflow_ratio AS DOUBLE) as inflow_ratio,
+    stock_count,
+    inflow_stocks,
+    CAST(avg_inflow_ratio AS DOUBLE) as avg_inflow_ratio,
+    -- 连续净流入天数：从最近一天往前数，到第一个非净流入日为止
+    COALESCE(
+        MIN(CASE WHEN net_inflow <= 0 THEN day_rank END) OVER (PARTITION BY block_code) - 1,
+        day_count
+    ) as continuity_days
+FROM ranked
+ORDER BY avg_inflow_ratio DESC, block_code, trade_date
+""")
+
+# 个股资金流向明细（金额列在SQL中转为DOUBLE，驱动直接返回float，免去逐个 Decimal 构造和转换）
+STOCK_FLOW_DETAILS_SQL = text("""
+SELECT 
+    trade_date,
+    total_buy_amount,
+    total_sell_amount,
+    CAST(net_inflow AS DOUBLE) as net_inflow,
+    CAST(inflow_ratio AS DOUBLE) as inflow_ratio,
+    CAST(large_net_inflow AS DOUBLE) as large_net_inflow,
+    large_inflow_ratio,
+    CAST(total_amount AS DOUBLE) as total_amount
+FROM stock_price_distribution
+WHERE stock_code = :stock_code 
+  AND trade_date BETWEEN :start_date AND :end_date
+ORDER BY trade_date
+""")
+
+# 个股资金流向汇总（STDDEV_POP 与 np.std 一致）
+STOCK_FLOW_SUMMARY_SQL = text("""
+SELECT 
+    COUNT(*) as days,
+    SUM(net_inflow) as total_net_inflow,
+    AVG(net_inflow) as avg_daily_inflow,
+    MAX(net_inflow) as max_inflow,
+    MIN(net_inflow) as min_inflow,
+    STDDEV_POP(net_inflow) as inflow_std,
+    SUM(CASE WHEN net_inflow > 0 THEN 1 ELSE 0 END) as positive_days,
+    SUM(CASE WHEN net_inflow < 0 THEN 1 ELSE 0 END) as negative_days
+FROM stock_price_distribution
+WHERE stock_code = :stock_code 
+  AND trade_date BETWEEN :start_date AND :end_date
+""")
+
+# 区间内最近5日净流入（用于近期趋势）
+STOCK_FLOW_RECENT_SQL = text("""
+SELECT net_inflow
+FROM stock_price_distribution
+WHERE stock_code = :stock_code 
+  AND trade_date BETWEEN :start_date AND :end_date
+ORDER BY trade_date DESC
+LIMIT 5
+""")
 
 
 class CapitalFlowAnalysis:
@@ -14,125 +126,78 @@ class CapitalFlowAnalysis:
         self.db = db
 
     def calculate_block_capital_flow(self, trade_date: str,
-                                     days: int = 7) -> List[Dict]:
+                                     days: int = 7,
+                                     block_type: Optional[str] = None,
+                                     limit: int = 20) -> List[Dict]:
         """
         计算板块资金流向
-        """
-        # 获取指定日期的板块资金数据
-        query = """
-        SELECT 
-            b.block_code,
-            b.block_name,
-            b.block_type,
-            DATE_FORMAT(p.trade_date, '%Y-%m-%d') as trade_date,
-            SUM(p.total_buy_amount) as total_buy,
-            SUM(p.total_sell_amount) as total_sell,
-            SUM(p.net_inflow) as net_inflow,
-            SUM(p.total_amount) as total_amount,
-            COUNT(DISTINCT p.stock_code) as stock_count,
-            SUM(CASE WHEN p.net_inflow > 0 THEN 1 ELSE 0 END) as inflow_stocks
-        FROM stock_block_membership b
-        INNER JOIN stock_price_distribution p 
-            ON b.stock_code = p.stock_code
-        WHERE p.trade_date BETWEEN :start_date AND :end_date
-        GROUP BY b.block_code, b.block_name, b.block_type, p.trade_date
-        ORDER BY net_inflow DESC
+
+        板块类型过滤、按平均流入比例取前 limit 个板块、连续净流入天数都在SQL中完成
         """
 
         start_date = (datetime.strptime(trade_date, '%Y-%m-%d') -
                       timedelta(days=days - 1)).strftime('%Y-%m-%d')
 
-        result = self.db.execute(query, {
+        result = self.db.execute(BLOCK_FLOW_SQL, {
             'start_date': start_date,
-            'end_date': trade_date
-        }).fetchall()
-
-        # 计算流入比例和连续天数
-        blocks = {}
-        for row in result:
-            block_code = row.block_code
-            if block_code not in blocks:
-                blocks[block_code] = {
-                    'block_code': block_code,
-                    'block_name': row.block_name,
-                    'block_type': row.block_type,
-                    'daily_flows': []
-                }
-
-            inflow_ratio = (row.net_inflow / row.total_amount * 100
-                            if row.total_amount > 0 else 0)
+            'end_date': trade_date,
+            'block_type': block_type,
+            'limit': limit
+        }).mappings().all()
 
-            blocks[block_code]['daily_flows'].append({
-                'date': row.trade_date,
-                'net_inflow': float(row.net_inflow),
-                'inflow_ratio': float(inflow_ratio),
-                'total_amount': float(row.total_amount),
-                'stock_count': row.stock_count,
-                'inflow_stocks': row.inflow_stocks
-            })
-
-        # 计算连续净流入天数
+        # 连续天数、平均流入比例已在SQL中计算，结果按板块、日期排好序，这里只按板块分组
         final_results = []
-        for block_data in blocks.values():
-            flows = sorted(block_data['daily_flows'], key=lambda x: x['date'])
-
-            # 计算连续净流入天数
-            continuity = 0
-            for flow in reversed(flows):
-                if flow['net_inflow'] > 0:
-                    continuity += 1
-                else:
-                    break
-
-            # 计算平均流入比例
-            avg_inflow_ratio = np.mean([f['inflow_ratio'] for f in flows])
+        for block_code, block_rows in groupby(result, key=itemgetter('block_code')):
+            block_rows = list(block_rows)
+            daily_flows = [
+                {
+                    'date': row['trade_date'],
+                    'net_inflow': row['net_inflow'],
+                    'inflow_ratio': row['inflow_ratio'],
+                    'total_amount': row['total_amount'],
+                    'stock_count': row['stock_count'],
+                    'inflow_stocks': row['inflow_stocks']
+                }
+                for row in block_rows
+            ]
+            first = block_rows[0]
 
             final_results.append({
-                **block_data,
-                'continuity_days': continuity,
-                'avg_inflow_ratio': avg_inflow_ratio,
-                'latest_flow': flows[-1] if flows else None
+                'block_code': block_code,
+                'block_name': first['block_name'],
+                'block_type': first['block_type'],
+                'daily_flows': daily_flows,
+                'continuity_days': first['continuity_days'],
+                'avg_inflow_ratio': first['avg_inflow_ratio'],
+                'latest_flow': daily_flows[-1]  # 按日期正序，最后一条即最近交易日
             })
 
-        # 按流入比例排序
-        final_results.sort(key=lambda x: x['avg_inflow_ratio'], reverse=True)
-
-        return final_results[:20]
+        return final_results
 
     def analyze_stock_capital_flow(self, stock_code: str,
-                                   start_date: str, end_date: str) -> Dict:
+                                   start_date: str, end_date: str,
+                                   include_details: bool = False) -> Dict:
         """
         分析个股资金流向
-        """
-        query = """
-        SELECT 
-            trade_date,
-            total_buy_amount,
-            total_sell_amount,
-            net_inflow,
-            inflow_ratio,
-            large_net_inflow,
-            large_inflow_ratio,
-            total_amount
-        FROM stock_price_distribution
-        WHERE stock_code = :stock_code 
-          AND trade_date BETWEEN :start_date AND :end_date
-        ORDER BY trade_date
-        """
 
-        result = self.db.execute(query, {
+        include_details=False 时只在SQL中聚合汇总指标（外加最近5日净流入），不返回 daily_details
+        """
+        params = {
             'stock_code': stock_code,
             'start_date': start_date,
             'end_date': end_date
-        }).fetchall()
+        }
+
+        if not include_details:
+            return self._summarize_stock_capital_flow(stock_code, params)
+
+        result = self.db.execute(STOCK_FLOW_DETAILS_SQL, params).mappings().all()
 
         if not result:
             return {}
 
         # 计算资金流向指标
-        dates = [r.trade_date for r in result]
-        net_inflows = [float(r.net_inflow) for r in result]
-        inflow_ratios = [float(r.inflow_ratio) for r in result]
+        net_inflows = np.fromiter((r['net_inflow'] for r in result), dtype=np.float64, count=len(result))
 
         analysis = {
             'stock_code': stock_code,
@@ -140,20 +205,20 @@ class CapitalFlowAnalysis:
                 'start_date': start_date,
                 'end_date': end_date
             },
-            'total_net_inflow': sum(net_inflows),
-            'avg_daily_inflow': np.mean(net_inflows),
-            'max_inflow': max(net_inflows),
-            'min_inflow': min(net_inflows),
+            'total_net_inflow': float(net_inflows.sum()),
+            'avg_daily_inflow': float(net_inflows.mean()),
+            'max_inflow': float(net_inflows.max()),
+            'min_inflow': float(net_inflows.min()),
             'inflow_continuity': self._calculate_continuity(net_inflows),
             'inflow_stability': self._calculate_stability(net_inflows),
             'recent_trend': self._analyze_trend(net_inflows[-5:]),
             'daily_details': [
                 {
-                    'date': str(r.trade_date),
-                    'net_inflow': float(r.net_inflow),
-                    'inflow_ratio': float(r.inflow_ratio),
-                    'large_net_inflow': float(r.large_net_inflow),
-                    'total_amount': float(r.total_amount)
+                    'date': str(r['trade_date']),
+                    'net_inflow': r['net_inflow'],
+                    'inflow_ratio': r['inflow_ratio'],
+                    'large_net_inflow': r['large_net_inflow'],
+                    'total_amount': r['total_amount']
                 }
                 for r in result
             ]
@@ -161,26 +226,63 @@ class CapitalFlowAnalysis:
 
         return analysis
 
-    def _calculate_continuity(self, flows: List[float]) -> Dict:
+    def _summarize_stock_capital_flow(self, stock_code: str, params: Dict) -> Dict:
+        """个股资金流向汇总：聚合在数据库完成，只返回一行汇总和最近5日净流入"""
+        summary = self.db.execute(STOCK_FLOW_SUMMARY_SQL, params).mappings().first()
+
+        if not summary or not summary['days']:
+            return {}
+
+        recent_flows = [float(flow) for flow in self.db.execute(STOCK_FLOW_RECENT_SQL, params).scalars()]
+        recent_flows.reverse()  # 查询按日期倒序，趋势按时间正序计算
+
+        days = summary['days']
+        avg_daily_inflow = float(summary['avg_daily_inflow'])
+        if days < 2:
+            stability = 1.0
+        else:
+            inflow_std = float(summary['inflow_std'])
+            stability = 1 - (inflow_std / abs(avg_daily_inflow)) if avg_daily_inflow != 0 else 1.0
+
+        return {
+            'stock_code': stock_code,
+            'analysis_period': {
+                'start_date': params['start_date'],
+                'end_date': params['end_date']
+            },
+            'total_net_inflow': float(summary['total_net_inflow']),
+            'avg_daily_inflow': avg_daily_inflow,
+            'max_inflow': float(summary['max_inflow']),
+            'min_inflow': float(summary['min_inflow']),
+            'inflow_continuity': {
+                'positive_days': int(summary['positive_days']),
+                'negative_days': int(summary['negative_days']),
+                'continuity_score': int(summary['positive_days']) / days
+            },
+            'inflow_stability': stability,
+            'recent_trend': self._analyze_trend(recent_flows)
+        }
+
+    def _calculate_continuity(self, flows: np.ndarray) -> Dict:
         """计算连续性指标"""
-        positive_days = sum(1 for f in flows if f > 0)
-        negative_days = sum(1 for f in flows if f < 0)
+        positive_days = int((flows > 0).sum())
+        negative_days = int((flows < 0).sum())
 
         return {
             'positive_days': positive_days,
             'negative_days': negative_days,
-            'continuity_score': positive_days / len(flows) if flows else 0
+            'continuity_score': positive_days / flows.size if flows.size else 0
         }
 
-    def _calculate_stability(self, flows: List[float]) -> float:
+    def _calculate_stability(self, flows: np.ndarray) -> float:
         """计算稳定性指标"""
-        if len(flows) < 2:
+        if flows.size < 2:
             return 1.0
 
-        mean = np.mean(flows)
-        std = np.std(flows)
+        mean = flows.mean()
+        std = flows.std()
 
-        return 1 - (std / abs(mean)) if mean != 0 else 1.0
+        return float(1 - (std / abs(mean))) if mean != 0 else 1.0
 
     def _analyze_trend(self, recent_flows: List[float]) -> str:
         """分析近期趋势"""
@@ -188,16 +290,10 @@ class CapitalFlowAnalysis:
             return 'stable'
 
         # 线性回归判断趋势
-        x = np.arange(len(recent_flows))
-        y = np.array(recent_flows)
-
-        try:
-            slope = np.polyfit(x, y, 1)[0]
-            if slope > 0.1:
-                return 'improving'
-            elif slope < -0.1:
-                return 'deteriorating'
-            else:
-                return 'stable'
-        except:
+        slope, _ = DataProcessor.linear_trend(recent_flows)
+        if slope > 0.1:
+            return 'improving'
+        elif slope < -0.1:
+            return 'deteriorating'
+        else:
             return 'stable'
\ No newline at end of file
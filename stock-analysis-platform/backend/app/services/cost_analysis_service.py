@@ -1,8 +1,89 @@
 # backend/app/services/cost_analysis_service.py
-import json
 import numpy as np
+import orjson
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Integer, bindparam, text
+from sqlalchemy.orm import Session
+
+from app.utils._njit import NUMBA_AVAILABLE, njit, prange  # 未安装numba时逐日用NumPy计算（_analyze_daily_cost）
+from app.utils.data_processor import DataProcessor
+
+# 持股成本分析数据：只取计算用到的列（price_distribution 为JSON文本）；
+# 区间 [今天-days, 今天] 内最多 days+1 个交易日，LIMIT 让 (stock_code, trade_date) 索引范围扫描可以提前结束
+COST_DISTRIBUTION_SQL = text("""
+SELECT 
+    trade_date,
+    price_distribution,
+    total_buy_amount,
+    total_sell_amount
+FROM stock_price_distribution
+WHERE stock_code = :stock_code
+  AND trade_date >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+ORDER BY trade_date DESC
+LIMIT :max_rows
+""").bindparams(bindparam('days', type_=Integer), bindparam('max_rows', type_=Integer))
+
+# _daily_cost_kernel 输出列
+DAILY_COST_COLUMNS = (
+    'buy_vwap', 'sell_vwap', 'price_median', 'cost_pressure',
+    'top20_price_range', 'volume_concentration', 'price_dispersion'
+)
+
+
+@njit('void(float64[:, :], float64[:, :], float64[:, :], float64[:, :], float64[:, :], int64[:], float64[:, :])',
+      parallel=True, cache=True)
+def _daily_cost_kernel(prices, buy_volumes, sell_volumes, buy_amounts, sell_amounts, lengths, out):
+    """
+    批量计算每日成本指标（numba编译，按交易日并行）
+
+    输入为补零后的 (天数, 最大价位数) 二维数组，lengths 为每天的有效价位数；
+    计算规则与 _analyze_daily_cost / _calculate_cost_concentration 一致，结果按 DAILY_COST_COLUMNS 写入 out
+    """
+    price_levels = 10
+    top20_count = max(1, price_levels // 5)
+
+    for d in prange(prices.shape[0]):
+        n = lengths[d]
+        p = prices[d, :n]
+        bv = buy_volumes[d, :n]
+        sv = sell_volumes[d, :n]
+
+        total_buy_volume = bv.sum()
+        total_sell_volume = sv.sum()
+        total_buy_amount = buy_amounts[d, :n].sum()
+        total_sell_amount = sell_amounts[d, :n].sum()
+
+        buy_vwap = total_buy_amount / total_buy_volume if total_buy_volume > 0 else 0.0
+        sell_vwap = total_sell_amount / total_sell_volume if total_sell_volume > 0 else 0.0
+        price_median = np.median(p)
+
+        out[d, 0] = buy_vwap
+        out[d, 1] = sell_vwap
+        out[d, 2] = price_median
+        out[d, 3] = (buy_vwap - sell_vwap) / price_median * 100 if price_median > 0 else 0.0
+
+        # 成本集中度
+        total_volume = total_buy_volume + total_sell_volume
+        if total_volume == 0:
+            out[d, 4] = 0.0
+            out[d, 5] = 0.0
+            out[d, 6] = 0.0
+        else:
+            price_min = p.min()
+            price_range = p.max() - price_min
+
+            volume_by_level = np.zeros(price_levels)
+            if price_range > 0:
+                for i in range(n):
+                    level = min(int((p[i] - price_min) / price_range * (price_levels - 1)), price_levels - 1)
+                    volume_by_level[level] += bv[i] + sv[i]
+            volume_by_level.sort()
+
+            price_mean = p.mean()
+            out[d, 4] = top20_count / price_levels
+            out[d, 5] = volume_by_level[price_levels - top20_count:].sum() / total_volume
+            out[d, 6] = price_range / price_mean if price_mean > 0 else 0.0
 
 
 class HoldingCostAnalysis:
@@ -17,74 +98,142 @@ class HoldingCostAnalysis:
         分析持股成本
         """
         # 获取价格分布数据
-        query = """
-        SELECT 
-            trade_date,
-            price_distribution,
-            total_buy_amount,
-            total_sell_amount,
-            total_buy_volume,
-            total_sell_volume
-        FROM stock_price_distribution
-        WHERE stock_code = :stock_code
-          AND trade_date >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
-        ORDER BY trade_date DESC
-        """
-
-        result = self.db.execute(query, {
+        result = self.db.execute(COST_DISTRIBUTION_SQL, {
             'stock_code': stock_code,
-            'days': lookback_days
-        }).fetchall()
+            'days': lookback_days,
+            'max_rows': lookback_days + 1
+        }).mappings().all()
 
         if not result:
             return {}
 
-        # 解析价格分布数据并计算成本指标
+        # 解析价格分布数据并计算成本指标，跳过价格分布解析失败（结果为空）的交易日
         cost_analyses = []
-        for row in result:
-            analysis = self._analyze_daily_cost(row)
-            analysis['date'] = str(row.trade_date)
-            cost_analyses.append(analysis)
+        for row, analysis in zip(result, self._analyze_daily_costs(result)):
+            if analysis:
+                analysis['date'] = str(row['trade_date'])
+                cost_analyses.append(analysis)
+
+        if not cost_analyses:
+            return {}
+
+        # 每日指标一次性取成数组，多日均值与趋势分析都在数组切片上计算
+        days = len(cost_analyses)
+        buy_vwaps = np.fromiter((d['buy_vwap'] for d in cost_analyses), dtype=np.float64, count=days)
+        sell_vwaps = np.fromiter((d['sell_vwap'] for d in cost_analyses), dtype=np.float64, count=days)
+        cost_pressures = np.fromiter((d['cost_pressure'] for d in cost_analyses), dtype=np.float64, count=days)
 
         # 计算多日平均成本
-        multi_day_costs = self._calculate_multi_day_cost(cost_analyses)
+        multi_day_costs = self._calculate_multi_day_cost(buy_vwaps, sell_vwaps, cost_pressures)
 
         # 生成持股成本报告
         report = {
             'stock_code': stock_code,
             'analysis_days': lookback_days,
-            'latest_cost': cost_analyses[0] if cost_analyses else {},
+            'latest_cost': cost_analyses[0],
             'cost_history': cost_analyses,
             'multi_day_averages': multi_day_costs,
-            'cost_trend_analysis': self._analyze_cost_trend(cost_analyses),
+            'cost_trend_analysis': self._analyze_cost_trend(buy_vwaps, cost_pressures),
             'support_resistance_levels': self._find_cost_levels(cost_analyses)
         }
 
         return report
 
+    def _analyze_daily_costs(self, rows) -> List[Dict]:
+        """
+        分析多日持股成本：逐行解析JSON，所有天的数值计算在一次 _daily_cost_kernel 调用中完成
+
+        未安装numba时逐日调用 _analyze_daily_cost
+        """
+        if not NUMBA_AVAILABLE:
+            return [self._analyze_daily_cost(row) for row in rows]
+
+        # orjson 解析期间持有GIL，线程池并行没有收益，直接逐行解析
+        parsed = [self._parse_price_arrays(row) for row in rows]
+
+        valid = [item[0] for item in parsed if item is not None]
+        if not valid:
+            return [{} for _ in rows]
+
+        # 补零成 (5, 天数, 最大价位数) 的数组
+        lengths = np.array([arr.shape[1] for arr in valid], dtype=np.int64)
+        data = np.zeros((5, len(valid), lengths.max()))
+        for i, arr in enumerate(valid):
+            data[:, i, :arr.shape[1]] = arr
+
+        out = np.empty((len(valid), len(DAILY_COST_COLUMNS)))
+        _daily_cost_kernel(data[0], data[1], data[2], data[3], data[4], lengths, out)
+
+        analyses = []
+        metrics = iter(out)
+        for item in parsed:
+            if item is None:
+                analyses.append({})
+                continue
+
+            _, total_buy_amount, total_sell_amount = item
+            (buy_vwap, sell_vwap, price_median, cost_pressure,
+             top20_price_range, volume_concentration, price_dispersion) = map(float, next(metrics))
+            analyses.append({
+                'buy_vwap': buy_vwap,
+                'sell_vwap': sell_vwap,
+                'vwap_spread': buy_vwap - sell_vwap,
+                'price_median': price_median,
+                'buy_median_diff': buy_vwap - price_median,
+                'sell_median_diff': sell_vwap - price_median,
+                'cost_pressure': cost_pressure,
+                'cost_concentration': {
+                    'top20_price_range': top20_price_range,
+                    'volume_concentration': volume_concentration,
+                    'price_dispersion': price_dispersion
+                },
+                'total_buy_amount': total_buy_amount,
+                'total_sell_amount': total_sell_amount
+            })
+
+        return analyses
+
+    @staticmethod
+    def _parse_price_arrays(row) -> Optional[Tuple[np.ndarray, float, float]]:
+        """
+        解析单日数据：价格分布转为 (5, 价位数) 数组（价格、买量、卖量、买额、卖额），连同当日买入、卖出总额返回
+
+        价格分布或总额无法解析（如NULL）时返回 None，与 _analyze_daily_cost 返回空字典的行为一致
+        """
+        try:
+            price_data = orjson.loads(row['price_distribution'])
+            arr = np.asarray([
+                price_data['p'], price_data['bv'], price_data['sv'],
+                price_data['ba'], price_data['sa']
+            ], dtype=np.float64)
+            if arr.ndim != 2 or arr.shape[1] == 0:
+                raise ValueError("价格分布数据为空或格式错误")
+            return arr, float(row['total_buy_amount']), float(row['total_sell_amount'])
+        except Exception as e:
+            print(f"Error analyzing daily cost: {e}")
+            return None
+
     def _analyze_daily_cost(self, row) -> Dict:
         """分析单日持股成本"""
         try:
-            price_data = json.loads(row.price_distribution)
+            price_data = orjson.loads(row['price_distribution'])
 
-            prices = np.array(price_data['p'])
-            buy_volumes = np.array(price_data['bv'])
-            sell_volumes = np.array(price_data['sv'])
-            buy_amounts = np.array(price_data['ba'])
-            sell_amounts = np.array(price_data['sa'])
+            # 五列数据一次转换成一个二维数组：价格、买量、卖量、买额、卖额
+            arr = np.asarray([
+                price_data['p'], price_data['bv'], price_data['sv'],
+                price_data['ba'], price_data['sa']
+            ], dtype=np.float64)
+            prices, buy_volumes, sell_volumes = arr[0], arr[1], arr[2]
+            totals = arr.sum(axis=1)
 
             # 计算买方VWAP
-            total_buy_amount = np.sum(buy_amounts)
-            total_buy_volume = np.sum(buy_volumes)
-            buy_vwap = total_buy_amount / total_buy_volume if total_buy_volume > 0 else 0
+            buy_vwap = totals[3] / totals[1] if totals[1] > 0 else 0
 
             # 计算卖方VWAP
-            total_sell_amount = np.sum(sell_amounts)
-            total_sell_volume = np.sum(sell_volumes)
-            sell_vwap = total_sell_amount / total_sell_volume if total_sell_volume > 0 else 0
+            sell_vwap = totals[4] / totals[2] if totals[2] > 0 else 0
 
             # 计算中位数和相关指标
-            price_median = np.median(prices)
+            price_median = self._median(prices)
             buy_median_diff = buy_vwap - price_median
             sell_median_diff = sell_vwap - price_median
 
@@ -105,17 +254,31 @@ class HoldingCostAnalysis:
                 'sell_median_diff': float(sell_median_diff),
                 'cost_pressure': float(cost_pressure),
                 'cost_concentration': cost_concentration,
-                'total_buy_amount': float(row.total_buy_amount),
-                'total_sell_amount': float(row.total_sell_amount)
+                'total_buy_amount': float(row['total_buy_amount']),
+                'total_sell_amount': float(row['total_sell_amount'])
             }
 
         except Exception as e:
             print(f"Error analyzing daily cost: {e}")
             return {}
 
+    @staticmethod
+    def _median(values: np.ndarray) -> float:
+        """中位数：np.partition 只做选择不做完整排序"""
+        n = len(values)
+        mid = n // 2
+        if n % 2:
+            return np.partition(values, mid)[mid]
+        part = np.partition(values, (mid - 1, mid))
+        return (part[mid - 1] + part[mid]) / 2
+
     def _calculate_cost_concentration(self, prices, buy_volumes, sell_volumes) -> Dict:
         """计算成本集中度"""
-        total_volume = np.sum(buy_volumes) + np.sum(sell_volumes)
+        prices, buy_volumes, sell_volumes = (
+            np.ascontiguousarray(a, dtype=np.float64) for a in (prices, buy_volumes, sell_volumes)
+        )
+        volumes = buy_volumes + sell_volumes
+        total_volume = volumes.sum()
 
         if total_volume == 0:
             return {
@@ -129,20 +292,20 @@ class HoldingCostAnalysis:
         price_max = np.max(prices)
         price_range = price_max - price_min
 
-        # 计算成交量在价格上的分布
+        # 计算成交量在价格上的分布：每个价格映射到区间编号后用 bincount 一次累加
         price_levels = 10
-        volume_by_level = np.zeros(price_levels)
-
-        for price, buy_vol, sell_vol in zip(prices, buy_volumes, sell_volumes):
-            if price_range > 0:
-                level = int((price - price_min) / price_range * (price_levels - 1))
-                level = min(level, price_levels - 1)
-                volume_by_level[level] += buy_vol + sell_vol
+        if price_range > 0:
+            levels = np.minimum(
+                ((prices - price_min) / price_range * (price_levels - 1)).astype(np.int64),
+                price_levels - 1
+            )
+            volume_by_level = np.bincount(levels, weights=volumes, minlength=price_levels)
+        else:
+            volume_by_level = np.zeros(price_levels)
 
-        # 计算前20%价格区间的成交量占比
-        sorted_indices = np.argsort(volume_by_level)[::-1]
+        # 计算前20%价格区间的成交量占比（只需选出最大的几个，不必完整排序）
         top20_count = max(1, price_levels // 5)
-        top20_volume = np.sum(volume_by_level[sorted_indices[:top20_count]])
+        top20_volume = np.partition(volume_by_level, price_levels - top20_count)[-top20_count:].sum()
 
         return {
             'top20_price_range': top20_count / price_levels,
@@ -150,9 +313,10 @@ class HoldingCostAnalysis:
             'price_dispersion': price_range / np.mean(prices) if np.mean(prices) > 0 else 0
         }
 
-    def _calculate_multi_day_cost(self, daily_analyses: List[Dict]) -> Dict:
-        """计算多日平均成本"""
-        if not daily_analyses:
+    def _calculate_multi_day_cost(self, buy_vwaps: np.ndarray, sell_vwaps: np.ndarray,
+                                  cost_pressures: np.ndarray) -> Dict:
+        """计算多日平均成本（输入按日期倒序，取前N天切片）"""
+        if not len(buy_vwaps):
             return {}
 
         # 按时间窗口计算平均成本
@@ -160,124 +324,117 @@ class HoldingCostAnalysis:
         results = {}
 
         for window in windows:
-            if len(daily_analyses) >= window:
-                window_data = daily_analyses[:window]
-
+            if len(buy_vwaps) >= window:
                 results[f'{window}d'] = {
-                    'avg_buy_vwap': np.mean([d['buy_vwap'] for d in window_data]),
-                    'avg_sell_vwap': np.mean([d['sell_vwap'] for d in window_data]),
-                    'avg_cost_pressure': np.mean([d['cost_pressure'] for d in window_data]),
-                    'cost_trend': self._determine_cost_trend(
-                        [d['buy_vwap'] for d in window_data]
-                    )
+                    'avg_buy_vwap': buy_vwaps[:window].mean(),
+                    'avg_sell_vwap': sell_vwaps[:window].mean(),
+                    'avg_cost_pressure': cost_pressures[:window].mean(),
+                    'cost_trend': self._determine_cost_trend(buy_vwaps[:window])
                 }
 
         return results
 
-    def _determine_cost_trend(self, cost_history: List[float]) -> str:
+    def _determine_cost_trend(self, cost_history: np.ndarray) -> str:
         """确定成本趋势"""
         if len(cost_history) < 2:
             return 'stable'
 
         # 使用线性回归判断趋势
-        x = np.arange(len(cost_history))
-        y = np.array(cost_history)
+        slope, r_squared = DataProcessor.linear_trend(cost_history)
 
-        try:
-            slope = np.polyfit(x, y, 1)[0]
-            r_squared = self._calculate_r_squared(x, y)
-
-            if r_squared > 0.5:  # 趋势明显
-                if slope > 0.01:
-                    return 'rising'
-                elif slope < -0.01:
-                    return 'falling'
-
-            return 'stable'
-        except:
-            return 'stable'
+        if r_squared > 0.5:  # 趋势明显
+            if slope > 0.01:
+                return 'rising'
+            elif slope < -0.01:
+                return 'falling'
 
-    def _calculate_r_squared(self, x, y):
-        """计算R平方值"""
-        if len(x) < 2:
-            return 0
+        return 'stable'
 
-        try:
-            coeffs = np.polyfit(x, y, 1)
-            p = np.poly1d(coeffs)
-            yhat = p(x)
-            ybar = np.sum(y) / len(y)
-            ssreg = np.sum((yhat - ybar) ** 2)
-            sstot = np.sum((y - ybar) ** 2)
-            return ssreg / sstot if sstot != 0 else 0
-        except:
-            return 0
-
-    def _analyze_cost_trend(self, cost_history: List[Dict]) -> Dict:
-        """分析成本趋势"""
-        if len(cost_history) < 5:
+    def _analyze_cost_trend(self, buy_vwaps: np.ndarray, cost_pressures: np.ndarray) -> Dict:
+        """分析成本趋势（输入按日期倒序，趋势按时间正序计算）"""
+        if len(buy_vwaps) < 5:
             return {'trend': 'insufficient_data'}
 
-        buy_vwaps = [d['buy_vwap'] for d in cost_history]
-        cost_pressures = [d['cost_pressure'] for d in cost_history]
-
-        # 计算趋势指标
-        trend_strength = self._calculate_trend_strength(buy_vwaps)
-        pressure_trend = self._calculate_trend_strength(cost_pressures)
+        buy_series = buy_vwaps[::-1]
+        pressure_series = cost_pressures[::-1]
 
         return {
-            'buy_cost_trend': self._determine_trend_direction(buy_vwaps),
-            'trend_strength': trend_strength,
-            'pressure_trend': pressure_trend,
-            'reversal_signals': self._detect_reversal_signals(buy_vwaps),
-            'support_levels': self._find_support_levels(buy_vwaps)
+            'buy_cost_trend': self._determine_cost_trend(buy_series),
+            'trend_strength': self._calculate_trend_strength(buy_series),
+            'pressure_trend': self._calculate_trend_strength(pressure_series),
+            'reversal_signals': self._detect_reversal_signals(buy_series),
+            'support_levels': self._find_support_levels(buy_series)
         }
 
+    @staticmethod
+    def _calculate_trend_strength(series: np.ndarray) -> float:
+        """趋势强度：线性回归R平方带上斜率方向，取值 [-1, 1]，正数为上升"""
+        slope, r_squared = DataProcessor.linear_trend(series)
+        return float(np.sign(slope) * r_squared)
+
+    @staticmethod
+    def _detect_reversal_signals(series: np.ndarray) -> List[str]:
+        """前半段与后半段回归斜率方向相反时给出反转信号（序列按时间正序）"""
+        half = len(series) // 2
+        earlier_slope, _ = DataProcessor.linear_trend(series[:half + 1])
+        recent_slope, _ = DataProcessor.linear_trend(series[half:])
+
+        if earlier_slope > 0 and recent_slope < 0:
+            return ['top_reversal']  # 成本由升转降
+        if earlier_slope < 0 and recent_slope > 0:
+            return ['bottom_reversal']  # 成本由降转升
+        return []
+
+    @staticmethod
+    def _find_support_levels(series: np.ndarray, max_levels: int = 3) -> List[float]:
+        """支撑位：成本序列的局部低点，由低到高取前 max_levels 个"""
+        lows = series[1:-1][(series[1:-1] < series[:-2]) & (series[1:-1] <= series[2:])]
+        return [float(level) for level in np.unique(lows)[:max_levels]]
+
     def _find_cost_levels(self, cost_history: List[Dict]) -> List[Dict]:
         """找出重要的成本支撑位和阻力位"""
         if not cost_history:
             return []
 
-        # 使用聚类方法找出成本密集区
-        from sklearn.cluster import KMeans
-
-        buy_costs = [d['buy_vwap'] for d in cost_history]
-        volumes = [d.get('total_buy_amount', 1) for d in cost_history]
+        buy_costs = np.array([d['buy_vwap'] for d in cost_history], dtype=np.float64)
+        volumes = np.array([d.get('total_buy_amount', 1) for d in cost_history], dtype=np.float64)
 
         if len(buy_costs) < 3:
             return []
 
-        # 准备数据
-        X = np.array(buy_costs).reshape(-1, 1)
-
-        # 确定最佳聚类数
-        n_clusters = min(3, len(set(buy_costs)))
-
-        try:
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-            clusters = kmeans.fit_predict(X)
-
-            # 计算每个簇的中心和权重
-            levels = []
-            for i in range(n_clusters):
-                cluster_points = X[clusters == i]
-                cluster_volumes = [volumes[j] for j in range(len(volumes)) if clusters[j] == i]
-
-                if len(cluster_points) > 0:
-                    center = float(np.mean(cluster_points))
-                    weight = len(cluster_points) / len(X)
-                    volume_weight = sum(cluster_volumes) / sum(volumes) if sum(volumes) > 0 else 0
-
-                    levels.append({
-                        'price_level': center,
-                        'frequency_weight': weight,
-                        'volume_weight': volume_weight,
-                        'sample_count': len(cluster_points),
-                        'type': 'support' if i == np.argmin(kmeans.cluster_centers_) else 'resistance'
-                    })
-
-            return sorted(levels, key=lambda x: x['price_level'])
-
-        except Exception as e:
-            print(f"Error finding cost levels: {e}")
-            return []
\ No newline at end of file
+        # 一维数据用直方图找成本密集区：按成交额加权，取局部峰值所在的价格区间
+        distinct_count = len(np.unique(buy_costs))
+        n_levels = min(3, distinct_count)
+        bins = min(10, distinct_count)
+        hist, edges = np.histogram(buy_costs, bins=bins, weights=volumes)
+        counts, _ = np.histogram(buy_costs, bins=edges)
+
+        # 成交额全为0时按出现次数选取
+        selection_weights = hist if hist.sum() > 0 else counts.astype(np.float64)
+        selection_weights = np.where(counts > 0, selection_weights, -1)
+
+        peaks = np.where(
+            (selection_weights[1:-1] > selection_weights[:-2]) &
+            (selection_weights[1:-1] > selection_weights[2:])
+        )[0] + 1
+        if len(peaks) > n_levels:
+            peaks = peaks[np.argsort(selection_weights[peaks])[-n_levels:]]
+        elif len(peaks) < n_levels:
+            # 峰值不足时取权重最大的几个区间
+            peaks = np.argpartition(selection_weights, -n_levels)[-n_levels:]
+        peaks = peaks[counts[peaks] > 0]
+
+        median_cost = self._median(buy_costs)
+        total_volume = hist.sum()
+        levels = []
+        for i in peaks:
+            price_level = float((edges[i] + edges[i + 1]) / 2)
+            levels.append({
+                'price_level': price_level,
+                'frequency_weight': float(counts[i] / len(buy_costs)),
+                'volume_weight': float(hist[i] / total_volume) if total_volume > 0 else 0,
+                'sample_count': int(counts[i]),
+                'type': 'support' if price_level <= median_cost else 'resistance'
+            })
+
+        return sorted(levels, key=lambda x: x['price_level'])
\ No newline at end of file
@@ -1,371 +1,908 @@
 # backend/app/services/scoring_service.py
+import asyncio
 import numpy as np
+import orjson
+import pybreaker
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from sqlalchemy import Float, Integer, bindparam, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core import cache
+from app.core.database import AsyncSessionLocal
+from config import settings
+
+# 评分熔断器：数据库连续失败20次后熔断60秒，期间直接失败不再访问数据库
+# 只有数据库驱动错误计入失败，单只股票数据异常不影响熔断状态
+scoring_breaker = pybreaker.CircuitBreaker(
+    fail_max=20,
+    reset_timeout=60,
+    exclude=[lambda e: not isinstance(e, DBAPIError)]
+)
+
+
+# 单只/批量评分的数据查询，每类数据一条SQL，按 stock_code IN :codes 批量获取
+SCORE_DATA_SQL = {
+    # 资金流向数据（近5日净流入天数取自 stock_daily_features，该日未刷新特征的股票回退为实时窗口聚合）
+    'capital': text("""
+    SELECT 
+        p.stock_code,
+        p.net_inflow,
+        p.inflow_ratio,
+        p.large_net_inflow,
+        p.large_inflow_ratio,
+        p.total_amount,
+        COALESCE(f.positive_days_5d, pf.positive_days, 0) as positive_days
+    FROM stock_price_distribution p
+    LEFT JOIN stock_daily_features f 
+        ON p.stock_code = f.stock_code 
+        AND f.trade_date = p.trade_date
+    LEFT JOIN (
+        SELECT s.stock_code, COUNT(*) as positive_days
+        FROM stock_price_distribution s
+        WHERE s.stock_code IN :codes
+          AND s.trade_date BETWEEN DATE_SUB(:date, INTERVAL 5 DAY) AND :date
+          AND s.net_inflow > 0
+          AND NOT EXISTS (
+              SELECT 1 FROM stock_daily_features sf
+              WHERE sf.stock_code = s.stock_code AND sf.trade_date = :date
+          )
+        GROUP BY s.stock_code
+    ) pf ON p.stock_code = pf.stock_code
+    WHERE p.stock_code IN :codes 
+      AND p.trade_date = :date
+    """).bindparams(bindparam('codes', expanding=True)),
+    # 技术指标数据
+    'technical': text("""
+    SELECT 
+        stock_code,
+        close_price,
+        ma5, ma20, ma60,
+        volume, vma5, vma20,
+        change_pct,
+        amplitude,
+        turnover_rate
+    FROM stock_day_data
+    WHERE stock_code IN :codes 
+      AND trade_date = :date
+    """).bindparams(bindparam('codes', expanding=True)),
+    # 板块信息（每只股票取一个板块）
+    'fundamental': text("""
+    SELECT 
+        stock_code, block_code, block_name, block_type,
+        inflow_ratio, ranking, continuity_days
+    FROM (
+        SELECT 
+            b.stock_code,
+            b.block_code,
+            b.block_name,
+            b.block_type,
+            bc.inflow_ratio,
+            bc.ranking,
+            bc.continuity_days,
+            ROW_NUMBER() OVER (PARTITION BY b.stock_code ORDER BY b.block_code) as rn
+        FROM stock_block_membership b
+        LEFT JOIN block_capital_flow bc 
+            ON b.block_code = bc.block_code 
+            AND bc.trade_date = :date
+        WHERE b.stock_code IN :codes
+    ) t
+    WHERE rn = 1
+    """).bindparams(bindparam('codes', expanding=True)),
+    # 风险指标（20日涨跌幅标准差取自 stock_daily_features，该日未刷新特征的股票回退为实时窗口聚合）
+    'risk': text("""
+    SELECT 
+        d.stock_code,
+        d.amplitude,
+        d.turnover_rate,
+        d.total_amount,
+        COALESCE(f.volatility_20d, v.volatility_20d) as volatility_20d
+    FROM stock_day_data d
+    LEFT JOIN stock_daily_features f 
+        ON d.stock_code = f.stock_code 
+        AND f.trade_date = d.trade_date
+    LEFT JOIN (
+        SELECT s.stock_code, STD(s.change_pct) as volatility_20d
+        FROM stock_day_data s
+        WHERE s.stock_code IN :codes
+          AND s.trade_date BETWEEN DATE_SUB(:date, INTERVAL 20 DAY) AND :date
+          AND NOT EXISTS (
+              SELECT 1 FROM stock_daily_features sf
+              WHERE sf.stock_code = s.stock_code AND sf.trade_date = :date
+          )
+        GROUP BY s.stock_code
+    ) v ON d.stock_code = v.stock_code
+    WHERE d.stock_code IN :codes 
+      AND d.trade_date = :date
+    """).bindparams(bindparam('codes', expanding=True))
+}
+
+# SCORE_DATA_SQL 各类数据中参与评分的数值列（批量评分时按列转换为数组）
+SCORE_FEATURE_FIELDS = {
+    'capital': ('net_inflow', 'inflow_ratio', 'large_net_inflow', 'large_inflow_ratio',
+                'total_amount', 'positive_days'),
+    'technical': ('close_price', 'ma5', 'ma20', 'ma60', 'volume', 'vma5', 'change_pct'),
+    'fundamental': ('inflow_ratio', 'ranking', 'continuity_days'),
+    'risk': ('amplitude', 'turnover_rate', 'total_amount', 'volatility_20d')
+}
+
+# 全市场评分CTE：scored 包含每只股票的四项得分与加权总分
+# 窗口特征取自 stock_daily_features；该日没有特征行的股票（未刷新的日期）由 positive_flows / volatility 实时聚合补齐
+_SCORED_CTE = """
+WITH positive_flows AS (
+    SELECT 
+        s.stock_code,
+        COUNT(*) as positive_days
+    FROM stock_price_distribution s
+    WHERE s.trade_date BETWEEN DATE_SUB(:date, INTERVAL 5 DAY) AND :date
+      AND s.net_inflow > 0
+      AND NOT EXISTS (
+          SELECT 1 FROM stock_daily_features sf
+          WHERE sf.stock_code = s.stock_code AND sf.trade_date = :date
+      )
+    GROUP BY s.stock_code
+),
+volatility AS (
+    SELECT 
+        s.stock_code,
+        STD(s.change_pct) as volatility_20d
+    FROM stock_day_data s
+    WHERE s.trade_date BETWEEN DATE_SUB(:date, INTERVAL 20 DAY) AND :date
+      AND NOT EXISTS (
+          SELECT 1 FROM stock_daily_features sf
+          WHERE sf.stock_code = s.stock_code AND sf.trade_date = :date
+      )
+    GROUP BY s.stock_code
+),
+first_block AS (
+    SELECT 
+        stock_code,
+        block_code,
+        block_type,
+        ROW_NUMBER() OVER (PARTITION BY stock_code ORDER BY block_code) as rn
+    FROM stock_block_membership
+),
+components AS (
+    SELECT 
+        p.stock_code,
+        d.stock_name,
+        LEAST(GREATEST(
+            50
+            + CASE WHEN p.net_inflow > 0 THEN LEAST(p.inflow_ratio * 2, 25) ELSE 0 END
+            + CASE WHEN p.large_net_inflow > 0 THEN LEAST(p.large_inflow_ratio * 2, 25) ELSE 0 END
+            + LEAST(COALESCE(f.positive_days_5d, pf.positive_days, 0) * 4, 20)
+            + LEAST(LOG10(GREATEST(p.total_amount, 1)) - 6, 10)
+        , 0), 100) as capital_score,
+        CASE WHEN d.stock_code IS NULL THEN 50 ELSE LEAST(GREATEST(
+            50
+            + CASE
+                WHEN COALESCE(d.ma5, 0) <> 0 AND COALESCE(d.ma20, 0) <> 0 AND COALESCE(d.ma60, 0) <> 0 THEN
+                    CASE
+                        WHEN d.ma5 > d.ma20 AND d.ma20 > d.ma60 THEN 30
+                        WHEN d.ma5 > d.ma20 THEN 20
+                        WHEN d.close_price > d.ma5 THEN 10
+                        ELSE 0
+                    END
+                ELSE 0
+              END
+            + CASE
+                WHEN COALESCE(d.volume, 0) <> 0 AND d.vma5 > 0 AND d.change_pct > 0 THEN
+                    CASE
+                        WHEN d.volume / d.vma5 > 1.2 THEN 20
+                        WHEN d.volume / d.vma5 > 1.0 THEN 10
+                        ELSE 0
+                    END
+                ELSE 0
+              END
+            + CASE
+                WHEN COALESCE(d.ma5, 0) <> 0 AND COALESCE(d.ma20, 0) <> 0
+                THEN LEAST(ABS((d.ma5 - d.ma20) / d.ma20 * 100), 15)
+                ELSE 0
+              END
+            + CASE
+                WHEN d.change_pct > 9 THEN -10
+                WHEN d.change_pct < -9 THEN 5
+                ELSE 0
+              END
+        , 0), 100) END as technical_score,
+        CASE WHEN fb.stock_code IS NULL THEN 50 ELSE LEAST(GREATEST(
+            50
+            + LEAST(COALESCE(bc.inflow_ratio, 0) * 5, 25)
+            + CASE WHEN COALESCE(bc.ranking, 0) <> 0 THEN GREATEST(0, 20 - bc.ranking / 5) ELSE 0 END
+            + LEAST(COALESCE(bc.continuity_days, 0) * 3, 15)
+            + CASE fb.block_type WHEN 'concept' THEN 5 WHEN 'industry' THEN 10 ELSE 0 END
+        , 0), 100) END as fundamental_score,
+        CASE WHEN d.stock_code IS NULL THEN 50 ELSE LEAST(GREATEST(
+            100
+            - CASE WHEN d.amplitude > 10 THEN 30 WHEN d.amplitude > 7 THEN 20 WHEN d.amplitude > 5 THEN 10 ELSE 0 END
+            - CASE WHEN d.turnover_rate > 20 THEN 25 WHEN d.turnover_rate > 10 THEN 15 WHEN d.turnover_rate > 5 THEN 5 ELSE 0 END
+            - CASE
+                WHEN COALESCE(d.total_amount, 0) = 0 THEN 0
+                WHEN d.total_amount < 10000000 THEN 20
+                WHEN d.total_amount < 50000000 THEN 10
+                ELSE 0
+              END
+            - CASE
+                WHEN COALESCE(f.volatility_20d, v.volatility_20d) > 3 THEN 15
+                WHEN COALESCE(f.volatility_20d, v.volatility_20d) > 2 THEN 10
+                ELSE 0
+              END
+        , 0), 100) END as risk_score
+    FROM stock_price_distribution p
+    LEFT JOIN stock_day_data d 
+        ON p.stock_code = d.stock_code 
+        AND p.trade_date = d.trade_date
+    LEFT JOIN stock_daily_features f 
+        ON p.stock_code = f.stock_code 
+        AND f.trade_date = p.trade_date
+    LEFT JOIN positive_flows pf 
+        ON p.stock_code = pf.stock_code
+    LEFT JOIN volatility v 
+        ON p.stock_code = v.stock_code
+    LEFT JOIN first_block fb 
+        ON p.stock_code = fb.stock_code 
+        AND fb.rn = 1
+    LEFT JOIN block_capital_flow bc 
+        ON fb.block_code = bc.block_code 
+        AND bc.trade_date = :date
+    WHERE p.trade_date = :date
+),
+scored AS (
+    SELECT 
+        stock_code,
+        stock_name,
+        capital_score,
+        technical_score,
+        fundamental_score,
+        risk_score,
+        capital_score * :w_capital
+            + technical_score * :w_technical
+            + fundamental_score * :w_fundamental
+            + risk_score * :w_risk as total_score
+    FROM components
+)
+"""
+_SCORE_WEIGHT_PARAMS = (
+    bindparam('w_capital', type_=Float),
+    bindparam('w_technical', type_=Float),
+    bindparam('w_fundamental', type_=Float),
+    bindparam('w_risk', type_=Float)
+)
+
+# 全市场批量评分：评分、过滤、排序与截断在一条SQL中完成
+SCORE_BATCH_SQL = text(_SCORED_CTE + """
+SELECT *
+FROM scored
+WHERE total_score >= :min_score
+ORDER BY total_score DESC
+LIMIT :limit
+""").bindparams(
+    *_SCORE_WEIGHT_PARAMS,
+    bindparam('min_score', type_=Float),
+    bindparam('limit', type_=Integer)
+)
+
+# 全市场评分（按总分降序，调度器每日写入 stock_scoring_result）
+SCORE_ALL_SQL = text(_SCORED_CTE + """
+SELECT *
+FROM scored
+ORDER BY total_score DESC
+""").bindparams(*_SCORE_WEIGHT_PARAMS)
+
+# 评分窗口特征刷新：按交易日计算近20日涨跌幅标准差、近5日净流入天数写入 stock_daily_features，
+# 评分时按主键读取，不再每次评分都对明细表做窗口聚合（窗口口径与原子查询一致）
+FEATURE_REFRESH_SQL = (
+    text("""
+    INSERT INTO stock_daily_features (stock_code, trade_date, volatility_20d, updated_at)
+    SELECT stock_code, :date, STD(change_pct), NOW()
+    FROM stock_day_data
+    WHERE trade_date BETWEEN DATE_SUB(:date, INTERVAL 20 DAY) AND :date
+    GROUP BY stock_code
+    ON DUPLICATE KEY UPDATE
+        volatility_20d = VALUES(volatility_20d),
+        updated_at = VALUES(updated_at)
+    """),
+    text("""
+    INSERT INTO stock_daily_features (stock_code, trade_date, positive_days_5d, updated_at)
+    SELECT stock_code, :date, SUM(CASE WHEN net_inflow > 0 THEN 1 ELSE 0 END), NOW()
+    FROM stock_price_distribution
+    WHERE trade_date BETWEEN DATE_SUB(:date, INTERVAL 5 DAY) AND :date
+    GROUP BY stock_code
+    ON DUPLICATE KEY UPDATE
+        positive_days_5d = VALUES(positive_days_5d),
+        updated_at = VALUES(updated_at)
+    """)
+)
+
+# 评分结果写入：同一交易日同一股票重复评分时覆盖
+SCORE_UPSERT_SQL = text("""
+INSERT INTO stock_scoring_result (
+    trade_date, stock_code, stock_name,
+    capital_score, technical_score, fundamental_score, risk_score, total_score,
+    capital_weight, technical_weight, fundamental_weight, risk_weight,
+    signal_type, signal_strength, ranking, analysis_summary, created_at
+) VALUES (
+    :trade_date, :stock_code, :stock_name,
+    :capital_score, :technical_score, :fundamental_score, :risk_score, :total_score,
+    :capital_weight, :technical_weight, :fundamental_weight, :risk_weight,
+    :signal_type, :signal_strength, :ranking, :analysis_summary, NOW()
+)
+ON DUPLICATE KEY UPDATE
+    stock_name = VALUES(stock_name),
+    capital_score = VALUES(capital_score),
+    technical_score = VALUES(technical_score),
+    fundamental_score = VALUES(fundamental_score),
+    risk_score = VALUES(risk_score),
+    total_score = VALUES(total_score),
+    capital_weight = VALUES(capital_weight),
+    technical_weight = VALUES(technical_weight),
+    fundamental_weight = VALUES(fundamental_weight),
+    risk_weight = VALUES(risk_weight),
+    signal_type = VALUES(signal_type),
+    signal_strength = VALUES(signal_strength),
+    ranking = VALUES(ranking),
+    analysis_summary = VALUES(analysis_summary),
+    created_at = VALUES(created_at)
+""")
+
+# 读取预先计算的高分股票（走 (trade_date, total_score) 索引）
+TOP_SCORES_SQL = text("""
+SELECT 
+    stock_code, stock_name, trade_date,
+    capital_score, technical_score, fundamental_score, risk_score, total_score,
+    capital_weight, technical_weight, fundamental_weight, risk_weight,
+    ranking, analysis_summary
+FROM stock_scoring_result
+WHERE trade_date = :date
+  AND total_score >= :min_score
+ORDER BY total_score DESC
+LIMIT :limit
+""").bindparams(
+    bindparam('min_score', type_=Float),
+    bindparam('limit', type_=Integer)
+)
+
+# 总分分档 [30, 40), [40, 50) ... 对应的信号类型与强度，np.searchsorted 直接定位档位
+SIGNAL_SCORE_EDGES = np.array([30, 40, 50, 60, 70, 80])
+SIGNAL_TYPES = np.array(['strong_sell', 'sell', 'reduce', 'hold', 'watch', 'buy', 'strong_buy'])
+SIGNAL_STRENGTHS = np.array([3, 2, 1, 0, 1, 2, 3])
+
+# 信号类型的中文说明
+SIGNAL_DESCRIPTIONS = {
+    'strong_buy': '强烈买入信号，资金与技术面共振向好',
+    'buy': '买入信号，综合评分较高',
+    'watch': '关注信号，可逢低关注',
+    'hold': '持有观望，多空信号不明确',
+    'reduce': '减仓信号，综合评分偏弱',
+    'sell': '卖出信号，资金与技术面走弱',
+    'strong_sell': '强烈卖出信号，注意控制风险'
+}
+
+# 分析摘要的优势/劣势文案：每个维度按阈值分档，np.searchsorted 定位档位后直接取文案，空字符串表示该档无结论
+# 优势为 得分 >= 阈值（side='right'），劣势为 得分 <= 阈值（side='left'）
+ANALYSIS_STRENGTHS = (
+    ('capital', np.array([60, 70]),
+     np.array(['', '资金面良好，有资金关注', '资金面强劲，主力资金持续流入'], dtype=object)),
+    ('technical', np.array([60, 70]),
+     np.array(['', '技术面稳健，处于上升通道', '技术形态良好，趋势向上'], dtype=object)),
+    ('fundamental', np.array([70]),
+     np.array(['', '板块效应明显，属于热点板块'], dtype=object)),
+    ('risk', np.array([80]),
+     np.array(['', '风险控制良好，波动性较低'], dtype=object))
+)
+ANALYSIS_WEAKNESSES = (
+    ('capital', np.array([40]),
+     np.array(['资金面疲弱，主力资金流出', ''], dtype=object)),
+    ('technical', np.array([40]),
+     np.array(['技术形态走弱，存在下行风险', ''], dtype=object)),
+    ('risk', np.array([40]),
+     np.array(['风险较高，波动性较大', ''], dtype=object))
+)
+
+# 模型信号类型到 stock_scoring_result.signal_type 枚举的映射，完整信号保存在 analysis_summary 中
+STORED_SIGNAL_TYPES = {
+    'strong_buy': 'BUY',
+    'buy': 'BUY',
+    'watch': 'HOLD',
+    'hold': 'HOLD',
+    'reduce': 'WARNING',
+    'sell': 'SELL',
+    'strong_sell': 'SELL'
+}
+
+
+def score_cache_key(stock_code: str, trade_date: str) -> str:
+    """单只股票评分结果的缓存key"""
+    return f"v1:score:{stock_code}:{trade_date}"
+
+
+@dataclass(frozen=True)
+class ScoringWeights:
+    """评分权重配置（默认取 settings.SCORING_WEIGHTS）"""
+    capital: float = settings.SCORING_WEIGHTS["capital"]  # 资金面权重
+    technical: float = settings.SCORING_WEIGHTS["technical"]  # 技术面权重
+    fundamental: float = settings.SCORING_WEIGHTS["fundamental"]  # 基本面权重
+    risk: float = settings.SCORING_WEIGHTS["risk"]  # 风险面权重
 
 
-@dataclass
-class ScoringWeights:
-    """评分权重配置"""
-    capital: float = 0.40  # 资金面权重
-    technical: float = 0.30  # 技术面权重
-    fundamental: float = 0.20  # 基本面权重
-    risk: float = 0.10  # 风险面权重
+@lru_cache(maxsize=32)
+def weight_vector(weights: ScoringWeights) -> np.ndarray:
+    """
+    四个维度权重向量，顺序与得分矩阵的列一致（资金、技术、基本面、风险）
+
+    每组权重只构建一次；返回的数组被多处共享，设为只读
+    """
+    vector = np.array([weights.capital, weights.technical, weights.fundamental, weights.risk],
+                      dtype=np.float64)
+    vector.flags.writeable = False
+    return vector
 
 
 class StockScoringModel:
     """股票综合评分模型"""
 
-    def __init__(self, db: Session, weights: ScoringWeights = None):
+    def __init__(self, db: Optional[Session] = None, weights: ScoringWeights = None):
         self.db = db
         self.weights = weights or ScoringWeights()
+        self._weights_vec = weight_vector(self.weights)
 
     def score_stock(self, stock_code: str, trade_date: str) -> Dict:
         """
         对股票进行综合评分
         """
-        # 1. 资金面评分
-        capital_score = self._calculate_capital_score(stock_code, trade_date)
-
-        # 2. 技术面评分
-        technical_score = self._calculate_technical_score(stock_code, trade_date)
+        return self.score_stocks([stock_code], trade_date)[0]
 
-        # 3. 基本面评分（基于板块）
-        fundamental_score = self._calculate_fundamental_score(stock_code, trade_date)
+    async def score_stock_async(self, stock_code: str, trade_date: str) -> Dict:
+        """对股票进行综合评分（四类数据并发查询）"""
+        return (await self.score_stocks_async([stock_code], trade_date))[0]
 
-        # 4. 风险面评分
-        risk_score = self._calculate_risk_score(stock_code, trade_date)
-
-        # 5. 计算总分
-        total_score = (
-                capital_score * self.weights.capital +
-                technical_score * self.weights.technical +
-                fundamental_score * self.weights.fundamental +
-                risk_score * self.weights.risk
-        )
+    async def score_stocks_async(self, stock_codes: List[str], trade_date: str) -> List[Dict]:
+        """
+        批量评分的异步版本，结果按 (stock_code, trade_date) 缓存到Redis
 
-        # 6. 生成买卖信号
-        signal = self._generate_signal(total_score, capital_score, technical_score)
+        先一次MGET取出已缓存的结果，只对未命中的股票查询数据库评分并写回缓存；
+        自定义权重的结果不缓存。返回顺序与 stock_codes 一致
+        """
+        use_cache = self.weights == ScoringWeights()
+        keys = [score_cache_key(code, trade_date) for code in stock_codes]
+        results = await cache.get_many(keys) if use_cache else [None] * len(stock_codes)
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            codes = [stock_codes[i] for i in missing]
+            data = await self.load_batch_async(codes, trade_date)
+            for i, result in zip(missing, self.score_loaded(codes, trade_date, data)):
+                results[i] = result
+
+            if use_cache:
+                await cache.set_many(
+                    {keys[i]: results[i] for i in missing},
+                    cache.ttl_for_trade_date(trade_date)
+                )
+
+        return results
+
+    def score_stocks(self, stock_codes: List[str], trade_date: str) -> List[Dict]:
+        """
+        对多只股票批量评分：每类数据只查询一次，四个维度得分在数组上一次算出
 
-        return {
-            'stock_code': stock_code,
-            'trade_date': trade_date,
-            'scores': {
-                'capital': round(capital_score, 2),
-                'technical': round(technical_score, 2),
-                'fundamental': round(fundamental_score, 2),
-                'risk': round(risk_score, 2),
-                'total': round(total_score, 2)
-            },
-            'weights': {
-                'capital': self.weights.capital,
-                'technical': self.weights.technical,
-                'fundamental': self.weights.fundamental,
-                'risk': self.weights.risk
-            },
-            'signal': signal,
-            'analysis': self._generate_analysis(
-                capital_score, technical_score, fundamental_score, risk_score
-            )
-        }
+        返回顺序与 stock_codes 一致
+        """
+        return self.score_loaded(stock_codes, trade_date, self.load_batch(stock_codes, trade_date))
 
-    def _calculate_capital_score(self, stock_code: str, trade_date: str) -> float:
-        """计算资金面评分"""
-        # 获取资金流向数据
-        query = """
-        SELECT 
-            net_inflow,
-            inflow_ratio,
-            large_net_inflow,
-            large_inflow_ratio,
-            total_amount,
-            (SELECT COUNT(*) FROM stock_price_distribution 
-             WHERE stock_code = :stock_code 
-               AND trade_date BETWEEN DATE_SUB(:date, INTERVAL 5 DAY) AND :date
-               AND net_inflow > 0) as positive_days
-        FROM stock_price_distribution
-        WHERE stock_code = :stock_code 
-          AND trade_date = :date
+    def load_batch(self, stock_codes: List[str], trade_date: str) -> Dict[str, Dict]:
         """
+        批量加载评分所需数据：每类数据只查询一次（stock_code IN ...）
 
-        result = self.db.execute(query, {
-            'stock_code': stock_code,
-            'date': trade_date
-        }).fetchone()
+        返回 {stock_code: {'capital': row, 'technical': row, 'fundamental': row, 'risk': row}}，
+        没有数据的维度为 None
+        """
+        data = {code: dict.fromkeys(SCORE_DATA_SQL) for code in stock_codes}
+        if not stock_codes:
+            return data
 
-        if not result:
-            return 50.0  # 默认中间分
+        params = {'codes': list(stock_codes), 'date': trade_date}
+        for name, query in SCORE_DATA_SQL.items():
+            for row in self.db.execute(query, params):
+                data[row.stock_code][name] = row
 
-        score = 50.0  # 基础分
+        return data
 
-        # 1. 净流入评分 (0-25分)
-        if result.net_inflow > 0:
-            score += min(result.inflow_ratio * 2, 25)
+    async def load_batch_async(self, stock_codes: List[str], trade_date: str) -> Dict[str, Dict]:
+        """
+        load_batch 的异步版本：四类数据查询互不依赖，用 asyncio.gather 并发执行
 
-        # 2. 大单净流入评分 (0-25分)
-        if result.large_net_inflow > 0:
-            score += min(result.large_inflow_ratio * 2, 25)
+        同一个 AsyncSession 不能并发执行查询，所以每类查询各使用一个独立会话（连接）。
+        """
+        data = {code: dict.fromkeys(SCORE_DATA_SQL) for code in stock_codes}
+        if not stock_codes:
+            return data
 
-        # 3. 持续性评分 (0-20分)
-        continuity_score = min(result.positive_days * 4, 20)
-        score += continuity_score
+        params = {'codes': list(stock_codes), 'date': trade_date}
 
-        # 4. 资金规模调整 (-10到+10分)
-        amount_adjust = min(np.log10(max(result.total_amount, 1)) - 6, 10)
-        score += amount_adjust
+        async def load(query):
+            async with AsyncSessionLocal() as session:
+                return (await session.execute(query, params)).all()
 
-        return min(max(score, 0), 100)
+        results = await asyncio.gather(*(load(query) for query in SCORE_DATA_SQL.values()))
+        for name, rows in zip(SCORE_DATA_SQL, results):
+            for row in rows:
+                data[row.stock_code][name] = row
 
-    def _calculate_technical_score(self, stock_code: str, trade_date: str) -> float:
-        """计算技术面评分"""
-        # 获取技术指标数据
-        query = """
-        SELECT 
-            close_price,
-            ma5, ma20, ma60,
-            volume, vma5, vma20,
-            change_pct,
-            amplitude,
-            turnover_rate
-        FROM stock_day_data
-        WHERE stock_code = :stock_code 
-          AND trade_date = :date
-        """
+        return data
 
-        result = self.db.execute(query, {
-            'stock_code': stock_code,
-            'date': trade_date
-        }).fetchone()
+    def score_loaded(self, stock_codes: List[str], trade_date: str, data: Dict[str, Dict]) -> List[Dict]:
+        """根据 load_batch 预取的数据批量评分"""
+        columns = {
+            name: self._feature_columns([data[code][name] for code in stock_codes], fields)
+            for name, fields in SCORE_FEATURE_FIELDS.items()
+        }
+        columns['fundamental']['block_type'] = np.array(
+            [row.block_type if row is not None else None
+             for row in (data[code]['fundamental'] for code in stock_codes)],
+            dtype=object
+        )
 
-        if not result:
-            return 50.0
+        # 1. 资金面评分
+        capital_scores = self._calculate_capital_score(columns['capital'])
 
-        score = 50.0
+        # 2. 技术面评分
+        technical_scores = self._calculate_technical_score(columns['technical'])
 
-        # 1. 均线排列评分 (0-30分)
-        ma_score = 0
-        if result.ma5 and result.ma20 and result.ma60:
-            if result.ma5 > result.ma20 > result.ma60:
-                ma_score = 30
-            elif result.ma5 > result.ma20:
-                ma_score = 20
-            elif result.close_price > result.ma5:
-                ma_score = 10
+        # 3. 基本面评分（基于板块）
+        fundamental_scores = self._calculate_fundamental_score(columns['fundamental'])
 
-        score += ma_score
+        # 4. 风险面评分
+        risk_scores = self._calculate_risk_score(columns['risk'])
 
-        # 2. 量价配合评分 (0-20分)
-        if result.volume and result.vma5:
-            volume_ratio = result.volume / result.vma5 if result.vma5 > 0 else 1
-            if result.change_pct > 0 and volume_ratio > 1.2:
-                score += 20
-            elif result.change_pct > 0 and volume_ratio > 1.0:
-                score += 10
+        return self._build_score_results(
+            stock_codes, trade_date,
+            capital_scores, technical_scores, fundamental_scores, risk_scores
+        )
 
-        # 3. 趋势强度评分 (0-15分)
-        if result.ma5 and result.ma20:
-            trend_strength = abs((result.ma5 - result.ma20) / result.ma20 * 100)
-            score += min(trend_strength, 15)
+    @staticmethod
+    def _feature_columns(rows: List, fields: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+        """
+        一类评分数据按列转换为数组，present 标记有数据的股票
 
-        # 4. 超买超卖调整 (-10到+10分)
-        # 简单的RSI替代计算
-        if result.change_pct:
-            if result.change_pct > 9:  # 接近涨停
-                score -= 10
-            elif result.change_pct < -9:  # 接近跌停
-                score += 5  # 超卖可能反弹
+        NULL 按 0 处理，与评分规则中按真值跳过的判断一致
+        """
+        columns = {
+            field: np.nan_to_num(np.array(
+                [getattr(row, field) if row is not None else None for row in rows],
+                dtype=np.float64
+            ))
+            for field in fields
+        }
+        columns['present'] = np.array([row is not None for row in rows], dtype=bool)
+        return columns
 
-        return min(max(score, 0), 100)
+    def score_batch_sql(self, trade_date: str, min_score: float,
+                        limit: int) -> List[Dict]:
+        """
+        批量评分：单条SQL完成全市场评分、过滤、排序与截断
 
-    def _calculate_fundamental_score(self, stock_code: str, trade_date: str) -> float:
-        """计算基本面评分（基于板块）"""
-        # 获取板块信息
-        query = """
-        SELECT 
-            b.block_code,
-            b.block_name,
-            b.block_type,
-            bc.inflow_ratio,
-            bc.ranking,
-            bc.continuity_days
-        FROM stock_block_membership b
-        LEFT JOIN block_capital_flow bc 
-            ON b.block_code = bc.block_code 
-            AND bc.trade_date = :date
-        WHERE b.stock_code = :stock_code
-        LIMIT 1
+        评分规则与 _calculate_*_score 保持一致，只有 total >= min_score
+        的前 limit 条记录会返回到应用层。
         """
 
-        result = self.db.execute(query, {
-            'stock_code': stock_code,
-            'date': trade_date
-        }).fetchone()
+        result = self.db.execute(SCORE_BATCH_SQL, {
+            'date': trade_date,
+            **self._weight_params(),
+            'min_score': min_score,
+            'limit': limit
+        }).fetchall()
 
-        if not result:
-            return 50.0
+        return self._build_score_results_from_rows(result, trade_date)
 
-        score = 50.0
+    def refresh_daily_features(self, trade_date: str) -> None:
+        """刷新指定交易日的评分窗口特征（每日数据入库后、评分前调用；历史日期可用于回填）"""
+        params = {'date': trade_date}
+        for query in FEATURE_REFRESH_SQL:
+            self.db.execute(query, params)
+        self.db.commit()
 
-        # 1. 板块资金流入评分 (0-25分)
-        if result.inflow_ratio:
-            score += min(result.inflow_ratio * 5, 25)
+    def store_scores(self, trade_date: str, batch_size: int = 500) -> int:
+        """
+        全市场评分并写入 stock_scoring_result，返回写入的股票数
 
-        # 2. 板块排名评分 (0-20分)
-        if result.ranking:
-            rank_score = max(0, 20 - result.ranking / 5)
-            score += rank_score
+        评分结果按总分降序分批读取、分批写入，ranking 为当日排名
+        """
+        stored = 0
+        # 流式结果占用连接期间不能再执行其它语句，读取使用单独连接，写入走当前会话
+        with self.db.get_bind().connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(SCORE_ALL_SQL, {'date': trade_date, **self._weight_params()})
+
+            for rows in result.partitions():
+                records = []
+                for row, score_result in zip(rows, self._build_score_results_from_rows(rows, trade_date)):
+                    stored += 1
+                    records.append(self._score_record(score_result, row.stock_name, stored))
+
+                self.db.execute(SCORE_UPSERT_SQL, records)
+                self.db.commit()
+
+        return stored
+
+    def load_top_scores(self, trade_date: str, min_score: float,
+                        limit: int) -> List[Dict]:
+        """读取调度器已写入的评分结果，返回格式与 score_batch_sql 一致"""
+        result = self.db.execute(TOP_SCORES_SQL, {
+            'date': trade_date,
+            'min_score': min_score,
+            'limit': limit
+        }).fetchall()
+
+        top_scores = []
+        for row in result:
+            summary = orjson.loads(row.analysis_summary) if row.analysis_summary else {}
+            top_scores.append({
+                'stock_code': row.stock_code,
+                'stock_name': row.stock_name,
+                'trade_date': str(row.trade_date),
+                'ranking': row.ranking,
+                'scores': {
+                    'capital': float(row.capital_score),
+                    'technical': float(row.technical_score),
+                    'fundamental': float(row.fundamental_score),
+                    'risk': float(row.risk_score),
+                    'total': float(row.total_score)
+                },
+                'weights': {
+                    'capital': float(row.capital_weight),
+                    'technical': float(row.technical_weight),
+                    'fundamental': float(row.fundamental_weight),
+                    'risk': float(row.risk_weight)
+                },
+                'signal': summary.get('signal'),
+                'analysis': summary.get('analysis')
+            })
+
+        return top_scores
+
+    def _weight_params(self) -> Dict[str, float]:
+        """评分SQL的权重参数"""
+        return {
+            'w_capital': self.weights.capital,
+            'w_technical': self.weights.technical,
+            'w_fundamental': self.weights.fundamental,
+            'w_risk': self.weights.risk
+        }
 
-        # 3. 板块持续性评分 (0-15分)
-        if result.continuity_days:
-            score += min(result.continuity_days * 3, 15)
+    def _score_record(self, score_result: Dict, stock_name: str, ranking: int) -> Dict:
+        """评分结果转换为 stock_scoring_result 的一行"""
+        scores = score_result['scores']
+        weights = score_result['weights']
+        signal = score_result['signal']
+        return {
+            'trade_date': score_result['trade_date'],
+            'stock_code': score_result['stock_code'],
+            'stock_name': stock_name,
+            'capital_score': scores['capital'],
+            'technical_score': scores['technical'],
+            'fundamental_score': scores['fundamental'],
+            'risk_score': scores['risk'],
+            'total_score': scores['total'],
+            'capital_weight': weights['capital'],
+            'technical_weight': weights['technical'],
+            'fundamental_weight': weights['fundamental'],
+            'risk_weight': weights['risk'],
+            'signal_type': STORED_SIGNAL_TYPES[signal['type']],
+            'signal_strength': signal['strength'],
+            'ranking': ranking,
+            'analysis_summary': orjson.dumps({
+                'signal': signal,
+                'analysis': score_result['analysis']
+            }).decode('utf-8')
+        }
+
+    def _build_score_results_from_rows(self, rows, trade_date: str) -> List[Dict]:
+        """根据评分SQL返回的行（含四个维度得分）批量组装评分结果"""
+        def column(name):
+            return np.fromiter((getattr(row, name) for row in rows), dtype=np.float64, count=len(rows))
 
-        # 4. 板块类型调整 (-10到+10分)
-        if result.block_type == 'concept':  # 概念板块波动大
-            score += 5
-        elif result.block_type == 'industry':  # 行业板块相对稳定
-            score += 10
+        return self._build_score_results(
+            [row.stock_code for row in rows], trade_date,
+            column('capital_score'), column('technical_score'),
+            column('fundamental_score'), column('risk_score')
+        )
 
-        return min(max(score, 0), 100)
+    def _build_score_results(self, stock_codes: List[str], trade_date: str,
+                             capital_scores: np.ndarray, technical_scores: np.ndarray,
+                             fundamental_scores: np.ndarray, risk_scores: np.ndarray) -> List[Dict]:
+        """根据四个维度得分数组批量组装评分结果，总分与信号在数组上一次算出"""
+        # 5. 计算总分：(N, 4) 得分矩阵乘权重向量
+        score_matrix = np.column_stack([capital_scores, technical_scores, fundamental_scores, risk_scores])
+        total_scores = score_matrix @ self._weights_vec
 
-    def _calculate_risk_score(self, stock_code: str, trade_date: str) -> float:
-        """计算风险面评分（越高表示风险越低）"""
-        # 获取风险指标
-        query = """
-        SELECT 
-            amplitude,
-            turnover_rate,
-            total_amount,
-            (SELECT STD(change_pct) 
-             FROM stock_day_data 
-             WHERE stock_code = :stock_code 
-               AND trade_date BETWEEN DATE_SUB(:date, INTERVAL 20 DAY) AND :date) as volatility_20d
-        FROM stock_day_data
-        WHERE stock_code = :stock_code 
-          AND trade_date = :date
-        """
+        # 6. 生成买卖信号
+        signal_types, strengths, confidences = self._generate_signals(
+            total_scores, capital_scores, technical_scores
+        )
 
-        result = self.db.execute(query, {
-            'stock_code': stock_code,
-            'date': trade_date
-        }).fetchone()
-
-        if not result:
-            return 50.0
-
-        score = 100.0  # 从100开始扣分
-
-        # 1. 波动率扣分 (0-30分)
-        if result.amplitude:
-            if result.amplitude > 10:
-                score -= 30
-            elif result.amplitude > 7:
-                score -= 20
-            elif result.amplitude > 5:
-                score -= 10
-
-        # 2. 换手率扣分 (0-25分)
-        if result.turnover_rate:
-            if result.turnover_rate > 20:
-                score -= 25
-            elif result.turnover_rate > 10:
-                score -= 15
-            elif result.turnover_rate > 5:
-                score -= 5
-
-        # 3. 流动性扣分 (0-20分)
-        if result.total_amount:
-            if result.total_amount < 10000000:  # 1000万
-                score -= 20
-            elif result.total_amount < 50000000:  # 5000万
-                score -= 10
-
-        # 4. 历史波动率扣分 (0-15分)
-        if result.volatility_20d:
-            if result.volatility_20d > 3:
-                score -= 15
-            elif result.volatility_20d > 2:
-                score -= 10
-
-        return min(max(score, 0), 100)
-
-    def _generate_signal(self, total_score: float,
-                         capital_score: float,
-                         technical_score: float) -> Dict:
-        """生成买卖信号"""
-        signal_types = {
-            'strong_buy': (80, 100),
-            'buy': (70, 80),
-            'watch': (60, 70),
-            'hold': (50, 60),
-            'reduce': (40, 50),
-            'sell': (30, 40),
-            'strong_sell': (0, 30)
+        # 7. 优势/劣势文案
+        score_columns = {
+            'capital': capital_scores,
+            'technical': technical_scores,
+            'fundamental': fundamental_scores,
+            'risk': risk_scores
+        }
+        analysis_strengths = self._analysis_messages(score_columns, ANALYSIS_STRENGTHS, 'right')
+        analysis_weaknesses = self._analysis_messages(score_columns, ANALYSIS_WEAKNESSES, 'left')
+
+        weights = {
+            'capital': self.weights.capital,
+            'technical': self.weights.technical,
+            'fundamental': self.weights.fundamental,
+            'risk': self.weights.risk
         }
 
-        # 确定信号类型
-        signal_type = 'hold'
-        for sig, (low, high) in signal_types.items():
-            if low <= total_score < high:
-                signal_type = sig
-                break
-
-        # 计算信号强度
-        strength = 0
-        if signal_type in ['strong_buy', 'strong_sell']:
-            strength = 3
-        elif signal_type in ['buy', 'sell']:
-            strength = 2
-        elif signal_type in ['watch', 'reduce']:
-            strength = 1
-
-        # 考虑资金和技术面的协调性
-        coordination = abs(capital_score - technical_score) / 100
-        if coordination > 0.3:  # 不协调
-            strength = max(0, strength - 1)
+        results = []
+        for i, stock_code in enumerate(stock_codes):
+            capital_score = float(capital_scores[i])
+            technical_score = float(technical_scores[i])
+            fundamental_score = float(fundamental_scores[i])
+            risk_score = float(risk_scores[i])
+            signal_type = str(signal_types[i])
+            strength = int(strengths[i])
+
+            results.append({
+                'stock_code': stock_code,
+                'trade_date': trade_date,
+                'scores': {
+                    'capital': round(capital_score, 2),
+                    'technical': round(technical_score, 2),
+                    'fundamental': round(fundamental_score, 2),
+                    'risk': round(risk_score, 2),
+                    'total': round(float(total_scores[i]), 2)
+                },
+                'weights': dict(weights),
+                'signal': {
+                    'type': signal_type,
+                    'strength': strength,
+                    'confidence': float(confidences[i]),
+                    'description': self._get_signal_description(signal_type, strength)
+                },
+                'analysis': self._generate_analysis(
+                    capital_score, technical_score, fundamental_score, risk_score,
+                    [message for message in analysis_strengths[i] if message],
+                    [message for message in analysis_weaknesses[i] if message]
+                )
+            })
+
+        return results
+
+    @staticmethod
+    def _calculate_capital_score(c: Dict[str, np.ndarray]) -> np.ndarray:
+        """计算资金面评分（无数据为默认中间分50）"""
+        score = (
+            50.0  # 基础分
+            # 1. 净流入评分 (0-25分)
+            + np.where(c['net_inflow'] > 0, np.minimum(c['inflow_ratio'] * 2, 25), 0)
+            # 2. 大单净流入评分 (0-25分)
+            + np.where(c['large_net_inflow'] > 0, np.minimum(c['large_inflow_ratio'] * 2, 25), 0)
+            # 3. 持续性评分 (0-20分)
+            + np.minimum(c['positive_days'] * 4, 20)
+            # 4. 资金规模调整 (-10到+10分)
+            + np.minimum(np.log10(np.maximum(c['total_amount'], 1)) - 6, 10)
+        )
+        return np.where(c['present'], np.clip(score, 0, 100), 50.0)
 
-        return {
-            'type': signal_type,
-            'strength': strength,
-            'confidence': min(100, total_score),
-            'description': self._get_signal_description(signal_type, strength)
-        }
+    @staticmethod
+    def _calculate_technical_score(c: Dict[str, np.ndarray]) -> np.ndarray:
+        """计算技术面评分"""
+        ma5, ma20, ma60 = c['ma5'], c['ma20'], c['ma60']
+        change_pct = c['change_pct']
 
-    def _generate_analysis(self, capital_score: float,
-                           technical_score: float,
-                           fundamental_score: float,
-                           risk_score: float) -> Dict:
-        """生成分析摘要"""
-        strengths = []
-        weaknesses = []
+        # 1. 均线排列评分 (0-30分)
+        ma_score = np.where(
+            (ma5 != 0) & (ma20 != 0) & (ma60 != 0),
+            np.select([(ma5 > ma20) & (ma20 > ma60), ma5 > ma20, c['close_price'] > ma5], [30, 20, 10], 0),
+            0
+        )
 
-        # 分析优势
-        if capital_score >= 70:
-            strengths.append("资金面强劲，主力资金持续流入")
-        elif capital_score >= 60:
-            strengths.append("资金面良好，有资金关注")
+        # 2. 量价配合评分 (0-20分)
+        vma5 = c['vma5']
+        volume_ratio = c['volume'] / np.where(vma5 > 0, vma5, 1)
+        volume_score = np.where(
+            (c['volume'] != 0) & (vma5 > 0) & (change_pct > 0),
+            np.select([volume_ratio > 1.2, volume_ratio > 1.0], [20, 10], 0),
+            0
+        )
 
-        if technical_score >= 70:
-            strengths.append("技术形态良好，趋势向上")
-        elif technical_score >= 60:
-            strengths.append("技术面稳健，处于上升通道")
+        # 3. 趋势强度评分 (0-15分)
+        trend_ok = (ma5 != 0) & (ma20 != 0)
+        trend_score = np.where(
+            trend_ok,
+            np.minimum(np.abs((ma5 - ma20) / np.where(trend_ok, ma20, 1) * 100), 15),
+            0
+        )
 
-        if fundamental_score >= 70:
-            strengths.append("板块效应明显，属于热点板块")
+        # 4. 超买超卖调整 (-10到+10分)：接近涨停扣分，接近跌停超卖可能反弹
+        change_adjust = np.select([change_pct > 9, change_pct < -9], [-10, 5], 0)
 
-        if risk_score >= 80:
-            strengths.append("风险控制良好，波动性较低")
+        score = 50.0 + ma_score + volume_score + trend_score + change_adjust
+        return np.where(c['present'], np.clip(score, 0, 100), 50.0)
 
-        # 分析劣势
-        if capital_score <= 40:
-            weaknesses.append("资金面疲弱，主力资金流出")
+    @staticmethod
+    def _calculate_fundamental_score(c: Dict[str, np.ndarray]) -> np.ndarray:
+        """计算基本面评分（基于板块）"""
+        ranking = c['ranking']
+        block_type = c['block_type']
+
+        score = (
+            50.0
+            # 1. 板块资金流入评分 (0-25分)
+            + np.minimum(c['inflow_ratio'] * 5, 25)
+            # 2. 板块排名评分 (0-20分)
+            + np.where(ranking != 0, np.maximum(0, 20 - ranking / 5), 0)
+            # 3. 板块持续性评分 (0-15分)
+            + np.minimum(c['continuity_days'] * 3, 15)
+            # 4. 板块类型调整：概念板块波动大+5，行业板块相对稳定+10
+            + np.select([block_type == 'concept', block_type == 'industry'], [5, 10], 0)
+        )
+        return np.where(c['present'], np.clip(score, 0, 100), 50.0)
+
+    @staticmethod
+    def _calculate_risk_score(c: Dict[str, np.ndarray]) -> np.ndarray:
+        """计算风险面评分（越高表示风险越低，从100开始扣分）"""
+        amplitude = c['amplitude']
+        turnover_rate = c['turnover_rate']
+        total_amount = c['total_amount']
+        volatility = c['volatility_20d']
+
+        score = (
+            100.0
+            # 1. 波动率扣分 (0-30分)
+            - np.select([amplitude > 10, amplitude > 7, amplitude > 5], [30, 20, 10], 0)
+            # 2. 换手率扣分 (0-25分)
+            - np.select([turnover_rate > 20, turnover_rate > 10, turnover_rate > 5], [25, 15, 5], 0)
+            # 3. 流动性扣分 (0-20分)：低于1000万扣20，低于5000万扣10
+            - np.where(total_amount != 0, np.select([total_amount < 10000000, total_amount < 50000000], [20, 10], 0), 0)
+            # 4. 历史波动率扣分 (0-15分)
+            - np.select([volatility > 3, volatility > 2], [15, 10], 0)
+        )
+        return np.where(c['present'], np.clip(score, 0, 100), 50.0)
 
-        if technical_score <= 40:
-            weaknesses.append("技术形态走弱，存在下行风险")
+    @staticmethod
+    def _generate_signals(total_scores: np.ndarray,
+                          capital_scores: np.ndarray,
+                          technical_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """批量生成买卖信号，返回 (信号类型, 信号强度, 置信度) 数组"""
+        # 确定信号类型：总分所在档位
+        levels = np.searchsorted(SIGNAL_SCORE_EDGES, total_scores, side='right')
 
-        if risk_score <= 40:
-            weaknesses.append("风险较高，波动性较大")
+        # 计算信号强度，资金和技术面不协调（相差超过30分）时降一级
+        strengths = SIGNAL_STRENGTHS[levels]
+        coordination = np.abs(capital_scores - technical_scores) / 100
+        strengths = np.where(coordination > 0.3, np.maximum(0, strengths - 1), strengths)
+
+        return SIGNAL_TYPES[levels], strengths, np.minimum(100, total_scores)
+
+    @staticmethod
+    def _analysis_messages(score_columns: Dict[str, np.ndarray], table: Tuple, side: str) -> np.ndarray:
+        """
+        按阈值表批量取出各维度文案，返回 (N, 维度数) 的文案矩阵
+
+        table 为 ANALYSIS_STRENGTHS / ANALYSIS_WEAKNESSES，列顺序与表中维度顺序一致
+        """
+        return np.column_stack([
+            messages[np.searchsorted(edges, score_columns[name], side=side)]
+            for name, edges, messages in table
+        ])
 
+    def _generate_analysis(self, capital_score: float,
+                           technical_score: float,
+                           fundamental_score: float,
+                           risk_score: float,
+                           strengths: List[str],
+                           weaknesses: List[str]) -> Dict:
+        """生成分析摘要，优势/劣势文案由 _analysis_messages 批量预先算出"""
         return {
             'strengths': strengths,
             'weaknesses': weaknesses,
@@ -375,4 +912,48 @@ class StockScoringModel:
             'key_considerations': self._get_key_considerations(
                 capital_score, technical_score, fundamental_score, risk_score
             )
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _get_signal_description(signal_type: str, strength: int) -> str:
+        """信号说明：强度被降为0时提示资金面与技术面分歧"""
+        description = SIGNAL_DESCRIPTIONS.get(signal_type, '')
+        if strength == 0 and signal_type != 'hold':
+            description += '（资金面与技术面分歧较大，信号较弱）'
+        return description
+
+    @staticmethod
+    def _generate_recommendation(capital_score: float,
+                                 technical_score: float,
+                                 risk_score: float) -> str:
+        """根据资金、技术、风险三个维度给出操作建议"""
+        if risk_score <= 40:
+            return "风险偏高，建议控制仓位并设置止损"
+        if capital_score >= 60 and technical_score >= 60:
+            return "资金与技术面共振，可逢低关注"
+        if capital_score >= 60:
+            return "资金持续关注，等待技术面确认后再介入"
+        if technical_score >= 60:
+            return "技术面向好但资金跟进不足，谨慎追高"
+        if capital_score <= 40 and technical_score <= 40:
+            return "资金与技术面均偏弱，建议观望"
+        return "多空信号不明确，建议观望"
+
+    @staticmethod
+    def _get_key_considerations(capital_score: float,
+                                technical_score: float,
+                                fundamental_score: float,
+                                risk_score: float) -> List[str]:
+        """需要重点关注的事项"""
+        considerations = []
+
+        if abs(capital_score - technical_score) > 30:
+            considerations.append("资金面与技术面背离，信号可靠性下降")
+
+        if fundamental_score < 50:
+            considerations.append("所属板块缺乏热度，板块效应有限")
+
+        if risk_score < 60:
+            considerations.append("波动性或换手率偏高，注意仓位管理")
+
+        return considerations or ["各维度表现均衡，关注后续资金的持续性"]
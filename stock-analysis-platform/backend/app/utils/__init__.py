@@ -1,5 +1,6 @@
 # backend/app/utils/__init__.py
 from .indicators import TechnicalIndicators
 from .data_processor import DataProcessor
+from .date_utils import get_today, today_str
 
-__all__ = ["TechnicalIndicators", "DataProcessor"]
\ No newline at end of file
+__all__ = ["TechnicalIndicators", "DataProcessor", "get_today", "today_str"]
\ No newline at end of file
@@ -0,0 +1,14 @@
+# backend/app/utils/_njit.py
+"""numba 可选依赖：未安装时 njit 退化为原函数，prange 退化为 range"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # 未安装numba时退化为纯Python实现
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
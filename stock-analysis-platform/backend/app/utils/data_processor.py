@@ -1,10 +1,41 @@
 # backend/app/utils/data_processor.py
-import json
 import numpy as np
-from typing import Dict, List, Any, Optional
+import orjson
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
 
+@lru_cache(maxsize=64)
+def _centered_x(n: int) -> Tuple[np.ndarray, float]:
+    """线性回归的中心化横坐标 0..n-1 及其平方和，按长度缓存（只读数组，各趋势计算共用）"""
+    dx = np.arange(n, dtype=np.float64) - (n - 1) / 2
+    dx.setflags(write=False)
+    return dx, float((dx * dx).sum())
+
+
+def _same_kind(data, result: np.ndarray):
+    """输入是 ndarray 时直接返回数组结果，否则转换为列表（与原有列表接口一致）"""
+    return result if isinstance(data, np.ndarray) else result.tolist()
+
+
+def _forward_fill_indices(mask: np.ndarray) -> np.ndarray:
+    """前向填充的取值下标：缺失位置取前一个有效值的下标（开头的缺失值仍指向自身所在的开头位置）"""
+    idx = np.where(~mask, np.arange(mask.size), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return idx
+
+
+# 价格分布JSON的字段：解析结果键名 -> JSON键名
+PRICE_DISTRIBUTION_FIELDS = {
+    "prices": "p",
+    "buy_volumes": "bv",
+    "sell_volumes": "sv",
+    "buy_amounts": "ba",
+    "sell_amounts": "sa"
+}
+
+
 class DataProcessor:
     """数据处理工具"""
 
@@ -12,31 +43,57 @@ class DataProcessor:
     def parse_price_distribution(price_distribution_json: str) -> Optional[Dict]:
         """解析价格分布JSON数据"""
         try:
-            data = json.loads(price_distribution_json)
+            data = orjson.loads(price_distribution_json)
             return {
-                "prices": np.array(data.get("p", [])),
-                "buy_volumes": np.array(data.get("bv", [])),
-                "sell_volumes": np.array(data.get("sv", [])),
-                "buy_amounts": np.array(data.get("ba", [])),
-                "sell_amounts": np.array(data.get("sa", []))
+                name: np.asarray(data.get(key, []), dtype=np.float64)
+                for name, key in PRICE_DISTRIBUTION_FIELDS.items()
             }
-        except (json.JSONDecodeError, KeyError) as e:
+        except (ValueError, TypeError, KeyError) as e:  # orjson.JSONDecodeError 是 ValueError 的子类
             print(f"解析价格分布数据失败: {e}")
             return None
 
+    @staticmethod
+    def parse_price_distribution_batch(price_distribution_jsons: List[str]) -> Dict[str, np.ndarray]:
+        """
+        批量解析价格分布JSON：每个字段所有记录拼接成一个连续数组
+
+        第 i 条记录对应切片 offsets[i]:offsets[i + 1]，解析失败或各字段长度不一致的记录长度为0
+        """
+        parts = {name: [] for name in PRICE_DISTRIBUTION_FIELDS}
+        lengths = np.zeros(len(price_distribution_jsons), dtype=np.int64)
+
+        for i, price_distribution_json in enumerate(price_distribution_jsons):
+            parsed = DataProcessor.parse_price_distribution(price_distribution_json)
+            if parsed is None or len({arr.size for arr in parsed.values()}) != 1:
+                continue
+            for name, arr in parsed.items():
+                parts[name].append(arr)
+            lengths[i] = parsed["prices"].size
+
+        result = {
+            name: np.concatenate(arrays) if arrays else np.empty(0)
+            for name, arrays in parts.items()
+        }
+        result["offsets"] = np.concatenate([[0], np.cumsum(lengths)])
+        return result
+
     @staticmethod
     def calculate_vwap(prices: np.ndarray, volumes: np.ndarray) -> float:
         """计算VWAP（成交量加权平均价）"""
         if len(prices) == 0 or len(volumes) == 0:
             return 0.0
 
-        total_value = np.sum(prices * volumes)
-        total_volume = np.sum(volumes)
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        volumes = np.ascontiguousarray(volumes, dtype=np.float64)
+
+        # 点积一次求出成交额，不生成 prices * volumes 临时数组
+        total_value = float(np.dot(prices, volumes))
+        total_volume = float(volumes.sum())
 
         if total_volume == 0:
             return 0.0
 
-        return float(total_value / total_volume)
+        return total_value / total_volume
 
     @staticmethod
     def calculate_price_metrics(prices: np.ndarray) -> Dict:
@@ -44,14 +101,21 @@ class DataProcessor:
         if len(prices) == 0:
             return {}
 
+        # 每个统计量只计算一次，range 和 cv 复用已有结果
+        prices = np.asarray(prices, dtype=np.float64)
+        mean = float(np.mean(prices))
+        std = float(np.std(prices))
+        min_price = float(np.min(prices))
+        max_price = float(np.max(prices))
+
         return {
-            "mean": float(np.mean(prices)),
+            "mean": mean,
             "median": float(np.median(prices)),
-            "std": float(np.std(prices)),
-            "min": float(np.min(prices)),
-            "max": float(np.max(prices)),
-            "range": float(np.max(prices) - np.min(prices)),
-            "cv": float(np.std(prices) / np.mean(prices) if np.mean(prices) != 0 else 0)  # 变异系数
+            "std": std,
+            "min": min_price,
+            "max": max_price,
+            "range": max_price - min_price,
+            "cv": std / mean if mean != 0 else 0.0  # 变异系数
         }
 
     @staticmethod
@@ -65,26 +129,27 @@ class DataProcessor:
         return float(pressure)
 
     @staticmethod
-    def normalize_data(data: List[float], method: str = "minmax") -> List[float]:
-        """数据归一化"""
-        if not data:
-            return []
+    def normalize_data(data: Union[List[float], np.ndarray],
+                       method: str = "minmax") -> Union[List[float], np.ndarray]:
+        """数据归一化（传入 ndarray 时返回 ndarray）"""
+        if len(data) == 0:
+            return _same_kind(data, np.empty(0))
 
-        data_array = np.array(data)
+        data_array = np.asarray(data, dtype=np.float64)
 
         if method == "minmax":
             min_val = np.min(data_array)
             max_val = np.max(data_array)
             if max_val == min_val:
-                return [0.5] * len(data)
-            return ((data_array - min_val) / (max_val - min_val)).tolist()
+                return _same_kind(data, np.full(len(data_array), 0.5))
+            return _same_kind(data, (data_array - min_val) / (max_val - min_val))
 
         elif method == "zscore":
             mean_val = np.mean(data_array)
             std_val = np.std(data_array)
             if std_val == 0:
-                return [0] * len(data)
-            return ((data_array - mean_val) / std_val).tolist()
+                return _same_kind(data, np.zeros(len(data_array)))
+            return _same_kind(data, (data_array - mean_val) / std_val)
 
         else:
             return data
@@ -102,32 +167,73 @@ class DataProcessor:
         return float(correlation) if not np.isnan(correlation) else 0.0
 
     @staticmethod
-    def detect_anomalies(data: List[float], threshold: float = 3) -> List[bool]:
-        """检测异常值"""
+    def calculate_correlation_matrix(series: np.ndarray) -> np.ndarray:
+        """
+        批量计算多只股票序列两两之间的相关系数矩阵，一次 np.corrcoef 代替逐对调用
+
+        series 为 (股票数, 天数) 二维数组，返回 (股票数, 股票数) 矩阵；
+        与 calculate_correlation 一致，无法计算（如序列为常数）的位置为 0
+        """
+        series = np.atleast_2d(np.asarray(series, dtype=np.float64))
+        n = series.shape[0]
+        if series.shape[1] < 2:
+            return np.zeros((n, n))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.atleast_2d(np.corrcoef(series))
+        correlation[np.isnan(correlation)] = 0.0
+        return correlation
+
+    @staticmethod
+    def linear_trend(values) -> Tuple[float, float]:
+        """
+        一元线性回归（x 为 0..n-1）的斜率和R平方，闭式解代替 np.polyfit
+
+        少于2个点时返回 (0.0, 0.0)
+        """
+        y = np.asarray(values, dtype=np.float64)
+        n = y.size
+        if n < 2:
+            return 0.0, 0.0
+
+        dx, sxx = _centered_x(n)
+        dy = y - y.mean()
+        sxy = (dx * dy).sum()
+        syy = (dy * dy).sum()
+
+        slope = sxy / sxx
+        r_squared = sxy * sxy / (sxx * syy) if syy else 0.0
+        return float(slope), float(r_squared)
+
+    @staticmethod
+    def detect_anomalies(data: Union[List[float], np.ndarray],
+                         threshold: float = 3) -> Union[List[bool], np.ndarray]:
+        """检测异常值（传入 ndarray 时返回布尔数组）"""
         if len(data) < 3:
-            return [False] * len(data)
+            return _same_kind(data, np.zeros(len(data), dtype=bool))
 
-        data_array = np.array(data)
+        data_array = np.asarray(data, dtype=np.float64)
         mean_val = np.mean(data_array)
         std_val = np.std(data_array)
 
         if std_val == 0:
-            return [False] * len(data)
+            return _same_kind(data, np.zeros(len(data_array), dtype=bool))
 
-        z_scores = np.abs((data_array - mean_val) / std_val)
-        return (z_scores > threshold).tolist()
+        # |x - mean| > threshold * std 与 z-score 判断等价，少一次整列除法
+        return _same_kind(data, np.abs(data_array - mean_val) > threshold * std_val)
 
     @staticmethod
-    def fill_missing_values(data: List[Optional[float]], method: str = "linear") -> List[float]:
-        """填充缺失值"""
-        if not data:
-            return []
+    def fill_missing_values(data: Union[List[Optional[float]], np.ndarray],
+                            method: str = "linear") -> Union[List[float], np.ndarray]:
+        """填充缺失值（传入 ndarray 时返回新的 ndarray，不修改原数组）"""
+        if len(data) == 0:
+            return _same_kind(data, np.empty(0))
 
-        data_array = np.array(data, dtype=float)
+        data_array = np.array(data, dtype=np.float64)
         mask = np.isnan(data_array)
 
         if not mask.any():
-            return data_array.tolist()
+            return _same_kind(data, data_array)
 
         if method == "linear":
             # 线性插值
@@ -135,13 +241,13 @@ class DataProcessor:
             data_array[mask] = np.interp(indices[mask], indices[~mask], data_array[~mask])
         elif method == "forward":
             # 前向填充
-            data_array = pd.Series(data_array).ffill().values
+            data_array = data_array[_forward_fill_indices(mask)]
         elif method == "backward":
-            # 后向填充
-            data_array = pd.Series(data_array).bfill().values
+            # 后向填充：在反转的序列上前向填充
+            data_array = data_array[::-1][_forward_fill_indices(mask[::-1])][::-1]
         elif method == "mean":
             # 均值填充
             mean_val = np.nanmean(data_array)
             data_array[mask] = mean_val
 
-        return data_array.tolist()
\ No newline at end of file
+        return _same_kind(data, data_array)
\ No newline at end of file
@@ -0,0 +1,20 @@
+# backend/app/utils/date_utils.py
+import time
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _today_for_minute(minute: int) -> str:
+    """按分钟缓存当天日期字符串"""
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def today_str() -> str:
+    """获取当天日期（YYYY-MM-DD），同一分钟内复用已格式化的结果"""
+    return _today_for_minute(int(time.time()) // 60)
+
+
+async def get_today() -> str:
+    """当天日期依赖（async def，FastAPI 直接在事件循环中调用，不经过线程池）"""
+    return today_str()
\ No newline at end of file
@@ -1,47 +1,117 @@
 # backend/app/utils/indicators.py
 import numpy as np
-from typing import List, Tuple, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Tuple, Optional, Union
+
+from ._njit import njit
+
+# 内核函数都声明了显式签名：导入模块时即完成编译（cache=True 时直接从磁盘缓存加载），
+# 首个请求不再承担JIT编译耗时；参数类型须与签名一致（float64 数组）
+
+
+@njit('float64[:](float64[:], int64, float64, float64)', cache=True)
+def _rsi_loop(deltas, period, up, down):
+    """RSI的Wilder平滑递推（逐bar依赖上一步结果，由numba编译）"""
+    n = deltas.shape[0] + 1
+    rsi = np.empty(n)
+
+    rs = up / down if down != 0 else 0.0
+    rsi[:period] = 100. - 100. / (1. + rs)
+
+    for i in range(period, n):
+        delta = deltas[i - 1]
+
+        if delta > 0:
+            upval = delta
+            downval = 0.
+        else:
+            upval = 0.
+            downval = -delta
+
+        up = (up * (period - 1) + upval) / period
+        down = (down * (period - 1) + downval) / period
+
+        rs = up / down if down != 0 else 0.0
+        rsi[i] = 100. - 100. / (1. + rs)
+
+    return rsi
+
+
+@njit('float64[:](float64[:], float64)', cache=True)
+def _ema_loop(prices, alpha):
+    """EMA一阶递推 ema[i] = alpha * price[i] + (1 - alpha) * ema[i-1]，以首个价格为初值（由numba编译）"""
+    n = prices.shape[0]
+    ema = np.empty(n)
+    ema[0] = prices[0]
+    for i in range(1, n):
+        ema[i] = alpha * prices[i] + (1 - alpha) * ema[i - 1]
+    return ema
+
+
+@njit('UniTuple(float64[:], 3)(float64[:], float64, float64, float64)', cache=True)
+def _macd_fused(prices, alpha_fast, alpha_slow, alpha_signal):
+    """
+    一次遍历同时递推快线、慢线和信号线EMA（由numba编译）
+
+    三条EMA均以首个值为初值，递推公式与 _ema_loop 相同，结果逐位一致
+    """
+    n = prices.shape[0]
+    macd = np.empty(n)
+    signal = np.empty(n)
+
+    ema_fast = ema_slow = prices[0]
+    macd[0] = 0.0
+    signal[0] = 0.0
+    for i in range(1, n):
+        ema_fast = alpha_fast * prices[i] + (1 - alpha_fast) * ema_fast
+        ema_slow = alpha_slow * prices[i] + (1 - alpha_slow) * ema_slow
+        macd[i] = ema_fast - ema_slow
+        signal[i] = alpha_signal * macd[i] + (1 - alpha_signal) * signal[i - 1]
+
+    return macd, signal, macd - signal
+
+
+@njit('float64[:](float64[:], int64, float64)', cache=True)
+def _wilder_smooth(values, period, seed):
+    """Wilder平滑：以 seed 为首值，从 values[period] 起逐个递推（由numba编译）"""
+    n = max(values.shape[0] - period, 0) + 1
+    out = np.empty(n)
+    out[0] = seed
+    for i in range(1, n):
+        out[i] = (out[i - 1] * (period - 1) + values[period + i - 1]) / period
+    return out
 
 
 class TechnicalIndicators:
     """技术指标计算工具"""
 
     @staticmethod
-    def calculate_ma(prices: List[float], period: int) -> List[float]:
+    def calculate_ma(prices: Union[List[float], np.ndarray], period: int) -> np.ndarray:
         """计算移动平均线"""
+        prices = np.asarray(prices, dtype=np.float64)
         if len(prices) < period:
-            return [np.nan] * len(prices)
-
-        ma_values = []
-        for i in range(len(prices)):
-            if i < period - 1:
-                ma_values.append(np.nan)
-            else:
-                ma = np.mean(prices[i - period + 1:i + 1])
-                ma_values.append(ma)
+            return np.full(len(prices), np.nan)
 
-        return ma_values
+        # 前缀和相减得到每个窗口的和，O(N) 且与周期长度无关
+        csum = np.concatenate([[0.0], np.cumsum(prices)])
+        ma = (csum[period:] - csum[:-period]) / period
+        return np.concatenate([np.full(period - 1, np.nan), ma])
 
     @staticmethod
-    def calculate_ema(prices: List[float], period: int) -> List[float]:
+    def calculate_ema(prices: Union[List[float], np.ndarray], period: int) -> np.ndarray:
         """计算指数移动平均线"""
         if len(prices) < period:
-            return [np.nan] * len(prices)
+            return np.full(len(prices), np.nan)
 
         alpha = 2 / (period + 1)
-        ema_values = [prices[0]]
-
-        for price in prices[1:]:
-            ema = alpha * price + (1 - alpha) * ema_values[-1]
-            ema_values.append(ema)
-
-        return ema_values
+        return _ema_loop(np.ascontiguousarray(prices, dtype=np.float64), alpha)
 
     @staticmethod
-    def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
+    def calculate_rsi(prices: Union[List[float], np.ndarray], period: int = 14) -> np.ndarray:
         """计算RSI指标"""
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
         if len(prices) < period + 1:
-            return [np.nan] * len(prices)
+            return np.full(len(prices), np.nan)
 
         deltas = np.diff(prices)
         seed = deltas[:period + 1]
@@ -49,131 +119,94 @@ class TechnicalIndicators:
         up = seed[seed >= 0].sum() / period
         down = -seed[seed < 0].sum() / period
 
-        if down == 0:
-            rs = 0
-        else:
-            rs = up / down
-
-        rsi = np.zeros_like(prices)
-        rsi[:period] = 100. - 100. / (1. + rs)
-
-        for i in range(period, len(prices)):
-            delta = deltas[i - 1]
-
-            if delta > 0:
-                upval = delta
-                downval = 0.
-            else:
-                upval = 0.
-                downval = -delta
-
-            up = (up * (period - 1) + upval) / period
-            down = (down * (period - 1) + downval) / period
-
-            if down == 0:
-                rs = 0
-            else:
-                rs = up / down
-
-            rsi[i] = 100. - 100. / (1. + rs)
-
-        return rsi.tolist()
+        return _rsi_loop(deltas, period, up, down)
 
     @staticmethod
-    def calculate_macd(prices: List[float],
+    def calculate_macd(prices: Union[List[float], np.ndarray],
                        fast_period: int = 12,
                        slow_period: int = 26,
-                       signal_period: int = 9) -> Tuple[List[float], List[float], List[float]]:
+                       signal_period: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """计算MACD指标"""
-        ema_fast = TechnicalIndicators.calculate_ema(prices, fast_period)
-        ema_slow = TechnicalIndicators.calculate_ema(prices, slow_period)
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        n = len(prices)
 
-        macd_line = []
-        for fast, slow in zip(ema_fast, ema_slow):
-            if np.isnan(fast) or np.isnan(slow):
-                macd_line.append(np.nan)
-            else:
-                macd_line.append(fast - slow)
+        # 数据不足时快线或慢线为 NaN，MACD 三条线全部为 NaN
+        if n < max(fast_period, slow_period, 1):
+            return np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
 
-        signal_line = TechnicalIndicators.calculate_ema(macd_line, signal_period)
-
-        histogram = []
-        for macd, signal in zip(macd_line, signal_line):
-            if np.isnan(macd) or np.isnan(signal):
-                histogram.append(np.nan)
-            else:
-                histogram.append(macd - signal)
+        macd_line, signal_line, histogram = _macd_fused(
+            prices, 2 / (fast_period + 1), 2 / (slow_period + 1), 2 / (signal_period + 1)
+        )
+        if n < signal_period:
+            signal_line[:] = np.nan
+            histogram[:] = np.nan
 
         return macd_line, signal_line, histogram
 
     @staticmethod
-    def calculate_bollinger_bands(prices: List[float],
+    def calculate_bollinger_bands(prices: Union[List[float], np.ndarray],
                                   period: int = 20,
-                                  num_std: float = 2) -> Tuple[List[float], List[float], List[float]]:
+                                  num_std: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """计算布林带"""
+        prices = np.asarray(prices, dtype=np.float64)
         ma = TechnicalIndicators.calculate_ma(prices, period)
+        if len(prices) < period:
+            return ma, np.full(len(prices), np.nan), np.full(len(prices), np.nan)
 
-        upper_band = []
-        lower_band = []
-
-        for i in range(len(prices)):
-            if i < period - 1:
-                upper_band.append(np.nan)
-                lower_band.append(np.nan)
-            else:
-                window = prices[i - period + 1:i + 1]
-                std = np.std(window)
-                upper_band.append(ma[i] + num_std * std)
-                lower_band.append(ma[i] - num_std * std)
+        # 所有窗口的标准差在一个零拷贝的滑动窗口视图上一次算出
+        std = sliding_window_view(prices, period).std(axis=1)
+        band = np.full(len(prices), np.nan)
+        band[period - 1:] = num_std * std
 
-        return ma, upper_band, lower_band
+        return ma, ma + band, ma - band
 
     @staticmethod
-    def calculate_atr(highs: List[float],
-                      lows: List[float],
-                      closes: List[float],
-                      period: int = 14) -> List[float]:
+    def calculate_atr(highs: Union[List[float], np.ndarray],
+                      lows: Union[List[float], np.ndarray],
+                      closes: Union[List[float], np.ndarray],
+                      period: int = 14) -> np.ndarray:
         """计算ATR（平均真实波幅）"""
         if len(highs) < period:
-            return [np.nan] * len(highs)
-
-        tr_values = []
-        for i in range(1, len(highs)):
-            hl = highs[i] - lows[i]
-            hc = abs(highs[i] - closes[i - 1])
-            lc = abs(lows[i] - closes[i - 1])
-            tr = max(hl, hc, lc)
-            tr_values.append(tr)
+            return np.full(len(highs), np.nan)
 
-        atr_values = [np.nan] * period
-        atr = np.mean(tr_values[:period])
-        atr_values.append(atr)
+        highs = np.asarray(highs, dtype=np.float64)
+        lows = np.asarray(lows, dtype=np.float64)
+        closes = np.asarray(closes, dtype=np.float64)
 
-        for i in range(period, len(tr_values)):
-            atr = (atr * (period - 1) + tr_values[i]) / period
-            atr_values.append(atr)
+        # 真实波幅：当日振幅、与前收盘价的两个差值取最大
+        prev_closes = closes[:-1]
+        tr_values = np.maximum.reduce([
+            highs[1:] - lows[1:],
+            np.abs(highs[1:] - prev_closes),
+            np.abs(lows[1:] - prev_closes)
+        ])
 
-        return atr_values
+        atr = _wilder_smooth(tr_values, period, np.mean(tr_values[:period]))
+        return np.concatenate([np.full(period, np.nan), atr])
 
     @staticmethod
-    def calculate_volume_indicators(volumes: List[int],
-                                    period: int = 20) -> Dict[str, List[float]]:
-        """计算成交量指标"""
+    def calculate_volume_indicators(volumes: Union[List[int], np.ndarray],
+                                    period: int = 20,
+                                    closes: Optional[Union[List[float], np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """
+        计算成交量指标
+
+        传入 closes 时能量潮按收盘价涨跌决定成交量的正负，否则为简化版（成交量直接累加）
+        """
+        volumes = np.asarray(volumes, dtype=np.float64)
         vma = TechnicalIndicators.calculate_ma(volumes, period)
 
-        # 计算量比
-        volume_ratios = []
-        for i, volume in enumerate(volumes):
-            if i < period - 1 or np.isnan(vma[i]):
-                volume_ratios.append(np.nan)
-            else:
-                volume_ratios.append(volume / vma[i])
-
-        # 计算能量潮（简化版）
-        obv = [0]
-        for i in range(1, len(volumes)):
-            # 这里需要价格数据来判断涨跌，简化处理
-            obv.append(obv[-1] + volumes[i])
+        # 计算量比（均量为 NaN 的前 period-1 个位置结果也是 NaN）
+        volume_ratios = volumes / vma
+
+        # 计算能量潮：首日为0，之后按方向累加当日成交量
+        if closes is not None:
+            closes = np.asarray(closes, dtype=np.float64)
+            direction = np.sign(np.diff(closes, prepend=closes[:1]))
+        else:
+            direction = np.ones_like(volumes)
+            direction[:1] = 0
+        obv = np.cumsum(direction * volumes)
 
         return {
             "vma": vma,
@@ -0,0 +1,8 @@
+-- 001_stock_search_indexes.sql
+-- 股票搜索索引（/api/v1/stock/search）
+--
+-- 搜索先执行 LIKE 'keyword%' 前缀匹配，可走下面两个BTREE索引做范围扫描；
+-- 只有前缀结果不足时才执行 LIKE '%keyword%'，前导 % 无法使用索引，会全表扫描。
+
+CREATE INDEX idx_day_stock_code ON stock_day_data (stock_code);
+CREATE INDEX idx_day_stock_name ON stock_day_data (stock_name);
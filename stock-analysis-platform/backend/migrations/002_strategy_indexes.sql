@@ -0,0 +1,19 @@
+-- 002_strategy_indexes.sql
+-- 策略接口索引（/api/v1/strategy/*）
+--
+-- 策略查询都先按 trade_date 过滤，再按 (stock_code, trade_date) 关联两张表。
+-- MySQL 不支持 INCLUDE，这里把常用的选择列直接追加到复合索引末尾，
+-- 资金流查询和选股器热点列可以只扫描索引（Using index），不再回表。
+
+-- 资金流向：按日期过滤 + 关联，inflow_ratio/net_inflow 由索引覆盖
+CREATE INDEX idx_spd_date_code ON stock_price_distribution (trade_date, stock_code, inflow_ratio, net_inflow);
+-- 按股票取近N日资金流（评分、连续流入统计）
+CREATE INDEX idx_spd_code_date ON stock_price_distribution (stock_code, trade_date);
+
+-- 日线：按日期过滤 + 关联，选股器与突破策略的常用列由索引覆盖
+CREATE INDEX idx_day_date_code ON stock_day_data (trade_date, stock_code, close_price, open_price, change_pct, amount, volume, ma5, ma20, vma20);
+-- 按股票取前一交易日/历史行情（突破策略 prev 关联、个股详情）
+CREATE INDEX idx_day_code_date ON stock_day_data (stock_code, trade_date);
+
+-- 建完索引（或批量回填数据）后刷新统计信息，让优化器选择新索引
+ANALYZE TABLE stock_price_distribution, stock_day_data;
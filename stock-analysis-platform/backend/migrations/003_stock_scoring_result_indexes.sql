@@ -0,0 +1,9 @@
+-- 003_stock_scoring_result_indexes.sql
+-- 评分结果表索引（/api/v1/strategy/top-scoring）
+--
+-- 调度器每日收盘后把全市场评分写入 stock_scoring_result，
+-- 使用 INSERT ... ON DUPLICATE KEY UPDATE 覆盖同一交易日的旧结果，需要唯一键；
+-- 高分股票接口按 trade_date 过滤、total_score 降序取前N条，走复合索引。
+
+ALTER TABLE stock_scoring_result ADD UNIQUE KEY uk_scoring_date_code (trade_date, stock_code);
+CREATE INDEX idx_scoring_date_total ON stock_scoring_result (trade_date, total_score);
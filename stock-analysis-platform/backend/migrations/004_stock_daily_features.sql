@@ -0,0 +1,17 @@
+-- 004_stock_daily_features.sql
+-- 股票日度评分特征表（评分接口与调度器全市场评分）
+--
+-- 评分需要近20日涨跌幅标准差和近5日净流入天数，原来每次评分都在两张明细表上做窗口聚合；
+-- 现在由调度器在每日数据入库后按交易日计算一次写入本表（StockScoringModel.refresh_daily_features），
+-- 评分查询按 (stock_code, trade_date) 主键直接读取。
+-- 没有特征行的交易日，评分查询回退为实时窗口聚合；历史交易日可调用 refresh_daily_features 回填。
+
+CREATE TABLE IF NOT EXISTS stock_daily_features (
+    stock_code VARCHAR(10) NOT NULL COMMENT '股票代码',
+    trade_date DATE NOT NULL COMMENT '交易日期',
+    volatility_20d DOUBLE NULL COMMENT '近20日涨跌幅标准差',
+    positive_days_5d INT NOT NULL DEFAULT 0 COMMENT '近5日净流入天数',
+    updated_at DATETIME NULL,
+    PRIMARY KEY (stock_code, trade_date),
+    KEY idx_features_date (trade_date)
+) COMMENT = '股票日度评分特征表';
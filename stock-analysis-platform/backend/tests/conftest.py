@@ -0,0 +1,9 @@
+# backend/tests/conftest.py
+import sys
+from pathlib import Path
+
+# 与 uvicorn 在 backend 目录下启动时一致：app 包在 backend 下，config 包在项目根目录
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+for path in (BACKEND_DIR, BACKEND_DIR.parent):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,94 @@
+# backend/tests/test_cost_analysis_service.py
+from datetime import date, timedelta
+
+import orjson
+import pytest
+
+from app.services import cost_analysis_service
+from app.services.cost_analysis_service import HoldingCostAnalysis
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def execute(self, *args, **kwargs):
+        return FakeResult(self._rows)
+
+
+def make_rows(days, broken=()):
+    """按日期倒序构造价格分布行，broken 中的下标为无法解析的价格分布"""
+    rows = []
+    for i in range(days):
+        price = 10 + (i % 7) * 0.1
+        distribution = {
+            'p': [price - 0.1, price, price + 0.1],
+            'bv': [100, 300, 200], 'sv': [150, 250, 100],
+            'ba': [(price - 0.1) * 100, price * 300, (price + 0.1) * 200],
+            'sa': [(price - 0.1) * 150, price * 250, (price + 0.1) * 100]
+        }
+        rows.append({
+            'trade_date': date(2024, 3, 1) - timedelta(days=i),
+            'price_distribution': 'not json' if i in broken else orjson.dumps(distribution).decode(),
+            'total_buy_amount': 1e6,
+            'total_sell_amount': 9e5
+        })
+    return rows
+
+
+def test_analyze_holding_cost_with_trend_and_empty_days():
+    rows = make_rows(30, broken={0, 5})
+
+    report = HoldingCostAnalysis(FakeSession(rows)).analyze_holding_cost('600000', 30)
+
+    # 解析失败的交易日被跳过，最新成本取最近一个有效交易日
+    assert len(report['cost_history']) == 28
+    assert report['latest_cost']['date'] == '2024-02-29'
+
+    trend = report['cost_trend_analysis']
+    assert trend['buy_cost_trend'] in ('rising', 'falling', 'stable')
+    assert -1 <= trend['trend_strength'] <= 1
+    assert -1 <= trend['pressure_trend'] <= 1
+    assert set(trend['reversal_signals']) <= {'top_reversal', 'bottom_reversal'}
+    assert all(isinstance(level, float) for level in trend['support_levels'])
+
+
+def test_analyze_holding_cost_without_valid_days():
+    rows = make_rows(6, broken=set(range(6)))
+
+    assert HoldingCostAnalysis(FakeSession(rows)).analyze_holding_cost('600000', 6) == {}
+
+
+def flatten(analysis):
+    flat = {key: value for key, value in analysis.items() if key != 'cost_concentration'}
+    flat.update(analysis.get('cost_concentration', {}))
+    return flat
+
+
+def test_daily_costs_kernel_matches_fallback(monkeypatch):
+    rows = make_rows(12, broken={3})
+    # 买入、卖出总额为NULL的交易日，两条路径都应视为解析失败
+    rows[1]['total_buy_amount'] = None
+    rows[7]['total_sell_amount'] = None
+    analyzer = HoldingCostAnalysis(FakeSession(rows))
+
+    monkeypatch.setattr(cost_analysis_service, 'NUMBA_AVAILABLE', True)
+    kernel = analyzer._analyze_daily_costs(rows)
+    monkeypatch.setattr(cost_analysis_service, 'NUMBA_AVAILABLE', False)
+    fallback = analyzer._analyze_daily_costs(rows)
+
+    assert [i for i, analysis in enumerate(kernel) if not analysis] == [1, 3, 7]
+    assert [i for i, analysis in enumerate(fallback) if not analysis] == [1, 3, 7]
+    for kernel_day, fallback_day in zip(kernel, fallback):
+        assert flatten(kernel_day) == pytest.approx(flatten(fallback_day))
@@ -0,0 +1,70 @@
+# backend/tests/test_scoring_service.py
+from collections import namedtuple
+
+import orjson
+
+from app.services.scoring_service import SCORE_FEATURE_FIELDS, StockScoringModel
+
+TRADE_DATE = '2024-01-02'
+
+# 与 SCORE_DATA_SQL 各查询的结果列一致
+ROW_TYPES = {
+    name: namedtuple(f'{name}_row', ('stock_code',) + fields + (('block_type',) if name == 'fundamental' else ()))
+    for name, fields in SCORE_FEATURE_FIELDS.items()
+}
+
+STRONG_STOCK = {
+    'capital': dict(net_inflow=6e7, inflow_ratio=12.0, large_net_inflow=3e7, large_inflow_ratio=8.0,
+                    total_amount=8e8, positive_days=5),
+    'technical': dict(close_price=12.0, ma5=11.5, ma20=11.0, ma60=10.0, volume=2e6, vma5=1e6, change_pct=4.0),
+    'fundamental': dict(inflow_ratio=6.0, ranking=3, continuity_days=4, block_type='concept'),
+    'risk': dict(amplitude=3.0, turnover_rate=4.0, total_amount=8e8, volatility_20d=1.5)
+}
+
+
+def make_rows(stock_code, values):
+    return {name: ROW_TYPES[name](stock_code=stock_code, **fields) for name, fields in values.items()}
+
+
+def assert_score_result(result, stock_code):
+    assert result['stock_code'] == stock_code
+    assert result['trade_date'] == TRADE_DATE
+    assert set(result['scores']) == {'capital', 'technical', 'fundamental', 'risk', 'total'}
+    assert result['signal']['description']
+    assert isinstance(result['analysis']['recommendation'], str) and result['analysis']['recommendation']
+    assert result['analysis']['key_considerations']
+    # 结果会写入Redis缓存和 analysis_summary，必须能直接序列化
+    assert orjson.loads(orjson.dumps(result)) == result
+
+
+def test_score_loaded_builds_complete_results():
+    data = {
+        '600000': make_rows('600000', STRONG_STOCK),
+        '600001': dict.fromkeys(SCORE_FEATURE_FIELDS)  # 全部维度无数据
+    }
+
+    strong, missing = StockScoringModel().score_loaded(list(data), TRADE_DATE, data)
+
+    assert_score_result(strong, '600000')
+    assert_score_result(missing, '600001')
+
+    assert strong['scores']['total'] > 60
+    assert strong['signal']['type'] in ('watch', 'buy', 'strong_buy')
+    assert strong['analysis']['strengths']
+
+    # 无数据的维度按中性分50处理
+    assert all(missing['scores'][name] == 50 for name in ('capital', 'technical', 'fundamental', 'risk'))
+    assert missing['signal']['type'] == 'hold'
+
+
+def test_build_score_results_from_stored_rows():
+    row_type = namedtuple('scored_row', ('stock_code', 'capital_score', 'technical_score',
+                                         'fundamental_score', 'risk_score'))
+    rows = [row_type('600000', 85.0, 20.0, 40.0, 30.0)]
+
+    result, = StockScoringModel()._build_score_results_from_rows(rows, TRADE_DATE)
+
+    assert_score_result(result, '600000')
+    assert '技术形态走弱，存在下行风险' in result['analysis']['weaknesses']
+    assert result['analysis']['recommendation'] == "风险偏高，建议控制仓位并设置止损"
+    assert "资金面与技术面背离，信号可靠性下降" in result['analysis']['key_considerations']
@@ -0,0 +1,222 @@
+# backend/tests/test_scoring_sql_parity.py
+"""
+全市场评分SQL（SCORE_ALL_SQL）与 NumPy 评分（_calculate_*_score）一致性测试
+
+评分规则在 _SCORED_CTE 与 StockScoringModel 中各实现了一遍，需要真实 MySQL 执行：
+设置 TEST_DATABASE_URL（如 mysql+pymysql://root@127.0.0.1:3306/stock_test）后运行，
+测试会在该库中重建评分用到的表，请使用单独的测试库。
+"""
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.models import BlockCapitalFlow, StockDailyFeatures
+from app.services.scoring_service import SCORE_ALL_SQL, StockScoringModel
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="未设置 TEST_DATABASE_URL")
+
+TRADE_DATE = date(2024, 3, 25)
+
+# 评分SQL读取的明细表（只建评分用到的列）
+SOURCE_TABLES_DDL = (
+    """
+    CREATE TABLE stock_price_distribution (
+        stock_code VARCHAR(10) NOT NULL,
+        trade_date DATE NOT NULL,
+        net_inflow DECIMAL(20, 4),
+        inflow_ratio DECIMAL(10, 4),
+        large_net_inflow DECIMAL(20, 4),
+        large_inflow_ratio DECIMAL(10, 4),
+        total_amount DECIMAL(20, 4),
+        PRIMARY KEY (stock_code, trade_date)
+    )
+    """,
+    """
+    CREATE TABLE stock_day_data (
+        stock_code VARCHAR(10) NOT NULL,
+        stock_name VARCHAR(50),
+        trade_date DATE NOT NULL,
+        close_price DECIMAL(10, 4),
+        ma5 DECIMAL(10, 4),
+        ma20 DECIMAL(10, 4),
+        ma60 DECIMAL(10, 4),
+        volume BIGINT,
+        vma5 BIGINT,
+        vma20 BIGINT,
+        change_pct DECIMAL(10, 4),
+        amplitude DECIMAL(10, 4),
+        turnover_rate DECIMAL(10, 4),
+        total_amount DECIMAL(20, 4),
+        PRIMARY KEY (stock_code, trade_date)
+    )
+    """,
+    """
+    CREATE TABLE stock_block_membership (
+        stock_code VARCHAR(10) NOT NULL,
+        block_code VARCHAR(6) NOT NULL,
+        block_name VARCHAR(100),
+        block_type VARCHAR(20),
+        PRIMARY KEY (stock_code, block_code)
+    )
+    """
+)
+SOURCE_TABLES = ('stock_price_distribution', 'stock_day_data', 'stock_block_membership')
+MODEL_TABLES = (BlockCapitalFlow.__table__, StockDailyFeatures.__table__)
+
+BLOCKS = (('BK0001', 'concept'), ('BK0002', 'industry'), ('BK0003', 'region'))
+
+
+def seed(conn):
+    """构造6只股票近25天的数据：覆盖无技术数据、无板块、窗口内无净流入等情况"""
+    rng = np.random.default_rng(7)
+    price_rows, day_rows, member_rows = [], [], []
+
+    for i in range(6):
+        code = f"60000{i}"
+        close = 10 + i
+        for back in range(25):
+            trade_date = TRADE_DATE - timedelta(days=back)
+            change_pct = float(rng.normal(0, 1 + i))
+            close *= 1 - change_pct / 100
+
+            # 600005 当日没有技术数据（技术面、风险面取默认分）
+            if not (i == 5 and back == 0):
+                ma5 = close * (1 + rng.uniform(-0.05, 0.05))
+                day_rows.append({
+                    'stock_code': code, 'stock_name': f"股票{i}", 'trade_date': trade_date,
+                    'close_price': close, 'ma5': ma5,
+                    'ma20': ma5 * (1 + rng.uniform(-0.08, 0.08)),
+                    'ma60': ma5 * (1 + rng.uniform(-0.1, 0.1)),
+                    'volume': int(rng.integers(1e5, 1e7)), 'vma5': int(rng.integers(1e5, 1e7)),
+                    'vma20': int(rng.integers(1e5, 1e7)),
+                    'change_pct': 11.5 if (i == 1 and back == 0) else change_pct,
+                    'amplitude': float(rng.uniform(1, 12)),
+                    'turnover_rate': float(rng.uniform(0.5, 25)),
+                    'total_amount': float(rng.uniform(5e6, 8e8))
+                })
+
+            if back <= 7:
+                # 600002 近5日没有净流入
+                net_inflow = -abs(rng.normal(1e6, 5e5)) if i == 2 else float(rng.normal(2e5, 1e6))
+                price_rows.append({
+                    'stock_code': code, 'trade_date': trade_date,
+                    'net_inflow': net_inflow, 'inflow_ratio': float(rng.uniform(0, 15)),
+                    'large_net_inflow': float(rng.normal(0, 1e6)),
+                    'large_inflow_ratio': float(rng.uniform(0, 15)),
+                    'total_amount': float(rng.uniform(1e5, 5e9))
+                })
+
+        # 600004 不属于任何板块（基本面取默认分），600000 属于两个板块取代码最小的一个
+        if i != 4:
+            for block_code, block_type in BLOCKS[i % 3:i % 3 + 1 + (i == 0)]:
+                member_rows.append({
+                    'stock_code': code, 'block_code': block_code,
+                    'block_name': block_code, 'block_type': block_type
+                })
+
+    flow_rows = [
+        {'trade_date': TRADE_DATE, 'block_code': block_code, 'block_name': block_code,
+         'block_type': block_type, 'inflow_ratio': 1.3 + n * 2.1, 'ranking': 3 + n * 40,
+         'continuity_days': n * 3}
+        for n, (block_code, block_type) in enumerate(BLOCKS)
+    ]
+
+    conn.execute(text("""
+        INSERT INTO stock_price_distribution VALUES (
+            :stock_code, :trade_date, :net_inflow, :inflow_ratio,
+            :large_net_inflow, :large_inflow_ratio, :total_amount)
+    """), price_rows)
+    conn.execute(text("""
+        INSERT INTO stock_day_data VALUES (
+            :stock_code, :stock_name, :trade_date, :close_price, :ma5, :ma20, :ma60,
+            :volume, :vma5, :vma20, :change_pct, :amplitude, :turnover_rate, :total_amount)
+    """), day_rows)
+    conn.execute(text("""
+        INSERT INTO stock_block_membership VALUES (:stock_code, :block_code, :block_name, :block_type)
+    """), member_rows)
+    conn.execute(text("""
+        INSERT INTO block_capital_flow (
+            trade_date, block_code, block_name, block_type, inflow_ratio, ranking, continuity_days)
+        VALUES (:trade_date, :block_code, :block_name, :block_type, :inflow_ratio, :ranking, :continuity_days)
+    """), flow_rows)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as conn:
+        for table in SOURCE_TABLES:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        for table in MODEL_TABLES:
+            table.drop(conn, checkfirst=True)
+        for ddl in SOURCE_TABLES_DDL:
+            conn.execute(text(ddl))
+        for table in MODEL_TABLES:
+            table.create(conn)
+        seed(conn)
+
+    session = Session(engine)
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as conn:
+            for table in SOURCE_TABLES:
+                conn.execute(text(f"DROP TABLE {table}"))
+            for table in MODEL_TABLES:
+                table.drop(conn)
+        engine.dispose()
+
+
+def sql_scores(model: StockScoringModel):
+    """SCORE_ALL_SQL 算出的四项得分与总分"""
+    rows = model.db.execute(SCORE_ALL_SQL, {'date': TRADE_DATE, **model._weight_params()}).fetchall()
+    return {
+        row.stock_code: {
+            'capital': float(row.capital_score),
+            'technical': float(row.technical_score),
+            'fundamental': float(row.fundamental_score),
+            'risk': float(row.risk_score),
+            'total': float(row.total_score)
+        }
+        for row in rows
+    }
+
+
+def assert_parity(model: StockScoringModel):
+    expected = sql_scores(model)
+    assert len(expected) == 6
+
+    codes = sorted(expected)
+    for result in model.score_stocks(codes, str(TRADE_DATE)):
+        # NumPy 路径的得分保留两位小数
+        assert result['scores'] == pytest.approx(expected[result['stock_code']], abs=0.006), result['stock_code']
+
+    return expected
+
+
+def test_sql_and_numpy_scores_match_with_and_without_features(db):
+    model = StockScoringModel(db)
+
+    # 未刷新特征：两条路径都回退到实时窗口聚合
+    live = assert_parity(model)
+
+    # 刷新特征后两条路径都读 stock_daily_features，得分与实时聚合一致
+    model.refresh_daily_features(str(TRADE_DATE))
+    features = db.execute(text("SELECT COUNT(*) FROM stock_daily_features")).scalar()
+    assert features == 6
+
+    refreshed = assert_parity(model)
+    for code, scores in live.items():
+        assert refreshed[code] == pytest.approx(scores), code
+
+    # 覆盖到了各类扣分/加分分支，不是全部取默认分
+    assert len({scores['capital'] for scores in live.values()}) > 1
+    assert live['600005']['technical'] == 50 and live['600005']['risk'] == 50
+    assert live['600004']['fundamental'] == 50